@@ -1,26 +1,145 @@
 """
 AlphaEar Dashboard - 数据库操作
 """
+import asyncio
+import atexit
 import sqlite3
-from datetime import datetime, timedelta
+import threading
+import time
 from pathlib import Path
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Iterator
 from loguru import logger
 
 from .models import DashboardRun, DashboardStep, HistoryItem, QueryGroup
 
+# PRAGMA optimize 执行间隔 (秒)
+_OPTIMIZE_INTERVAL = 15 * 60
+
+# 读缓存有效期 (秒) - Dashboard UI 高频轮询相同查询
+_CACHE_TTL = 2.0
+_CACHE_MISS = object()
+
+# ========== SQL 常量 - 固定语句字符串，命中 sqlite3 内置语句缓存 ==========
+SQL_INSERT_RUN = """
+    INSERT INTO dashboard_runs (run_id, query, sources, status, started_at, parent_run_id, user_id)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+"""
+SQL_GET_RUN = "SELECT * FROM dashboard_runs WHERE run_id = ?"
+SQL_DELETE_RUN = "DELETE FROM dashboard_runs WHERE run_id = ?"
+SQL_SAVE_RUN_DATA = "UPDATE dashboard_runs SET run_data_json = ? WHERE run_id = ?"
+SQL_GET_RUN_DATA = "SELECT run_data_json FROM dashboard_runs WHERE run_id = ?"
+SQL_INSERT_STEP = """
+    INSERT INTO dashboard_steps (run_id, step_type, agent, content, timestamp)
+    VALUES (?, ?, ?, ?, ?)
+"""
+# 内层 DESC 索引扫描取最近 N 条，外层 ASC 恢复时间序，免去 Python 端 reversed()
+SQL_GET_STEPS = """
+    SELECT * FROM (
+        SELECT id, run_id, step_type, agent, content, timestamp
+        FROM dashboard_steps WHERE run_id = ? ORDER BY id DESC LIMIT ?
+    ) ORDER BY id ASC
+"""
+SQL_GET_STEPS_SINCE = """
+    SELECT id, run_id, step_type, agent, content, timestamp
+    FROM dashboard_steps WHERE run_id = ? AND id > ? ORDER BY id ASC LIMIT ?
+"""
+SQL_GET_RUNNING = "SELECT * FROM dashboard_runs WHERE status = 'running' ORDER BY started_at DESC LIMIT 1"
+
+# update_run 允许更新的列及按列组合缓存的 SQL 模板
+_UPDATE_COLUMNS = ("query", "sources", "status", "started_at", "finished_at",
+                   "signal_count", "report_path", "error_message")
+_UPDATE_SQL_CACHE: Dict[tuple, str] = {}
+
 
 class DashboardDB:
     """Dashboard 数据库管理"""
-    
+
     def __init__(self, db_path: str = "data/signal_flux.db"):
         self.db_path = Path(db_path)
-        self.db_path.parent.mkdir(parents=True, exist_ok=True)
-        self.conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        is_new_db = str(db_path) == ":memory:" or not self.db_path.exists()
+        if str(db_path) != ":memory:":
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        # 写连接唯一且加锁; WAL 模式下读连接按线程懒加载，可与写并发
+        self.conn = sqlite3.connect(str(self.db_path), check_same_thread=False, cached_statements=256)
         self.conn.row_factory = sqlite3.Row
+        self._write_lock = threading.Lock()
+        self._local = threading.local()
+        if is_new_db:
+            # 两者都只能在新库初始化前设置，且 page_size 必须先于 auto_vacuum，
+            # 否则页大小被锁定在默认 4096；增量回收 delete_run 留下的空闲页
+            self.conn.execute("PRAGMA page_size=8192")
+            self.conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        self._tune_pragmas()
         self._init_tables()
+        self._last_optimize = time.monotonic()
+        self._cache: Dict[tuple, tuple[float, Any]] = {}
+        # 步骤查询缓存：任何写入都会整体失效，因此不设 TTL —
+        # 已结束 run 的步骤列表不可变，UI 反复打开时一直命中
+        self._steps_cache: Dict[tuple, list] = {}
+        atexit.register(self._optimize_on_exit)
         logger.info(f"📊 Dashboard DB initialized at {self.db_path}")
-    
+
+    def _optimize_on_exit(self):
+        """进程退出时刷新统计信息，供下次启动的查询计划使用"""
+        try:
+            self.conn.execute("PRAGMA optimize")
+        except sqlite3.Error:
+            pass
+
+    def _tune_pragmas(self):
+        """写入性能调优: WAL 避免每次 commit 的双重 fsync"""
+        # :memory: 数据库不支持 WAL
+        if str(self.db_path) != ":memory:":
+            self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("PRAGMA temp_store=MEMORY")
+        self.conn.execute("PRAGMA cache_size=-20000")  # 20 MB
+        self.conn.execute("PRAGMA busy_timeout=5000")
+        self.conn.execute("PRAGMA foreign_keys=ON")  # 级联删除需要
+        # mmap 让读路径直接命中 OS 页缓存
+        self.conn.execute("PRAGMA mmap_size=268435456")  # 256 MB
+
+    def _reader(self) -> sqlite3.Connection:
+        """获取当前线程的只读连接 (:memory: 退化为共享写连接)"""
+        if str(self.db_path) == ":memory:":
+            return self.conn
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.db_path), cached_statements=256)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA busy_timeout=5000")
+            conn.execute("PRAGMA cache_size=-20000")
+            conn.execute("PRAGMA mmap_size=268435456")  # 256 MB
+            self._local.conn = conn
+        return conn
+
+    def _maybe_optimize(self):
+        """周期性执行 PRAGMA optimize / 增量回收，保持查询计划最优"""
+        now = time.monotonic()
+        if now - self._last_optimize >= _OPTIMIZE_INTERVAL:
+            self._last_optimize = now
+            try:
+                self.conn.execute("PRAGMA optimize")
+                self.conn.execute("PRAGMA incremental_vacuum(128)")
+            except sqlite3.Error as e:
+                logger.warning(f"PRAGMA optimize failed: {e}")
+
+    # ========== 读缓存 ==========
+
+    def _cache_get(self, key: tuple) -> Any:
+        entry = self._cache.get(key)
+        if entry and time.monotonic() - entry[0] < _CACHE_TTL:
+            return entry[1]
+        return _CACHE_MISS
+
+    def _cache_put(self, key: tuple, value: Any) -> Any:
+        self._cache[key] = (time.monotonic(), value)
+        return value
+
+    def _invalidate_cache(self):
+        self._cache.clear()
+        self._steps_cache.clear()
+
     def _init_tables(self):
         """初始化表结构"""
         cursor = self.conn.cursor()
@@ -71,14 +190,59 @@ class DashboardDB:
                 agent TEXT,
                 content TEXT,
                 timestamp TEXT,
-                FOREIGN KEY (run_id) REFERENCES dashboard_runs(run_id)
+                FOREIGN KEY (run_id) REFERENCES dashboard_runs(run_id) ON DELETE CASCADE
             )
         """)
-        
+
+        # 自动迁移：旧版外键无 ON DELETE CASCADE，重建步骤表
+        # 按官方 ALTER TABLE 流程执行：先关外键检查，rename/create/copy/drop
+        # 放进同一个事务，中途失败整体回滚，不会留下半迁移状态
+        fk = cursor.execute("PRAGMA foreign_key_list(dashboard_steps)").fetchone()
+        if fk and fk['on_delete'] != 'CASCADE':
+            self.conn.commit()  # PRAGMA foreign_keys 在事务内是 no-op，先落掉挂起事务
+            self.conn.execute("PRAGMA foreign_keys=OFF")
+            try:
+                cursor.execute("BEGIN IMMEDIATE")
+                cursor.execute("ALTER TABLE dashboard_steps RENAME TO dashboard_steps_old")
+                cursor.execute("""
+                    CREATE TABLE dashboard_steps (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        run_id TEXT,
+                        step_type TEXT,
+                        agent TEXT,
+                        content TEXT,
+                        timestamp TEXT,
+                        FOREIGN KEY (run_id) REFERENCES dashboard_runs(run_id) ON DELETE CASCADE
+                    )
+                """)
+                # 只搬 run 仍存在的行：脏库里的孤儿步骤按新外键语义本就该被级联清掉
+                cursor.execute("""
+                    INSERT INTO dashboard_steps
+                    SELECT * FROM dashboard_steps_old
+                    WHERE run_id IN (SELECT run_id FROM dashboard_runs)
+                """)
+                cursor.execute("DROP TABLE dashboard_steps_old")
+                self.conn.commit()
+            except sqlite3.Error:
+                self.conn.rollback()
+                raise
+            finally:
+                self.conn.execute("PRAGMA foreign_keys=ON")
+            logger.info("Migrated database: dashboard_steps now cascades on run delete")
+
+
         # 创建索引
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_steps_run_id ON dashboard_steps(run_id)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_steps_run_id_id ON dashboard_steps(run_id, id DESC)")
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_runs_query ON dashboard_runs(query)")
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_runs_status ON dashboard_runs(status)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_runs_query_started ON dashboard_runs(query, started_at DESC)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_runs_started_at ON dashboard_runs(started_at DESC)")
+        # 部分索引：只覆盖 running 行，get_running_task 变成单行索引查找
+        cursor.execute("DROP INDEX IF EXISTS idx_runs_status")
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_runs_running
+            ON dashboard_runs(started_at DESC) WHERE status = 'running'
+        """)
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_runs_user_id ON dashboard_runs(user_id)")
         
         self.conn.commit()
@@ -87,42 +251,50 @@ class DashboardDB:
     
     def create_run(self, run: DashboardRun) -> DashboardRun:
         """创建新运行记录"""
-        cursor = self.conn.cursor()
-        cursor.execute("""
-            INSERT INTO dashboard_runs (run_id, query, sources, status, started_at, parent_run_id, user_id)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-        """, (run.run_id, run.query, run.sources, run.status, run.started_at, run.parent_run_id, run.user_id))
-        self.conn.commit()
+        with self._write_lock:
+            self.conn.execute(SQL_INSERT_RUN, (run.run_id, run.query, run.sources, run.status,
+                                               run.started_at, run.parent_run_id, run.user_id))
+            self.conn.commit()
+        self._invalidate_cache()
         return run
-    
+
     def get_run(self, run_id: str) -> Optional[DashboardRun]:
         """获取运行记录"""
-        cursor = self.conn.cursor()
-        cursor.execute("SELECT * FROM dashboard_runs WHERE run_id = ?", (run_id,))
+        cursor = self._reader().execute(SQL_GET_RUN, (run_id,))
         row = cursor.fetchone()
         if row:
-            return DashboardRun(**dict(row))
+            # DB 行是可信数据，model_construct 跳过逐字段校验
+            return DashboardRun.model_construct(**dict(row))
         return None
     
     def update_run(self, run_id: str, **kwargs) -> bool:
-        """更新运行记录"""
+        """更新运行记录 (仅白名单列)"""
         if not kwargs:
             return False
-        
-        set_clause = ", ".join([f"{k} = ?" for k in kwargs.keys()])
-        values = list(kwargs.values()) + [run_id]
-        
-        cursor = self.conn.cursor()
-        cursor.execute(f"UPDATE dashboard_runs SET {set_clause} WHERE run_id = ?", values)
-        self.conn.commit()
+
+        unknown = set(kwargs) - set(_UPDATE_COLUMNS)
+        if unknown:
+            raise ValueError(f"update_run: invalid columns {sorted(unknown)}")
+
+        # 同一列组合复用缓存 SQL，语句形状稳定可命中语句缓存
+        cols = tuple(k for k in _UPDATE_COLUMNS if k in kwargs)
+        sql = _UPDATE_SQL_CACHE.get(cols)
+        if sql is None:
+            set_clause = ", ".join(f"{c} = ?" for c in cols)
+            sql = _UPDATE_SQL_CACHE.setdefault(
+                cols, f"UPDATE dashboard_runs SET {set_clause} WHERE run_id = ?")
+
+        with self._write_lock:
+            cursor = self.conn.execute(sql, [kwargs[c] for c in cols] + [run_id])
+            self.conn.commit()
+        self._invalidate_cache()
         return cursor.rowcount > 0
-    
+
     def delete_run(self, run_id: str) -> bool:
-        """删除运行记录及其步骤"""
-        cursor = self.conn.cursor()
-        cursor.execute("DELETE FROM dashboard_steps WHERE run_id = ?", (run_id,))
-        cursor.execute("DELETE FROM dashboard_runs WHERE run_id = ?", (run_id,))
-        self.conn.commit()
+        """删除运行记录 (步骤由外键级联删除)"""
+        with self._write_lock, self.conn:
+            cursor = self.conn.execute(SQL_DELETE_RUN, (run_id,))
+        self._invalidate_cache()
         return cursor.rowcount > 0
     
     def save_run_data(self, run_id: str, data: Dict[str, Any]) -> bool:
@@ -130,13 +302,10 @@ class DashboardDB:
         import json
         # Log what we're saving
         logger.info(f"💾 Saving run_data for {run_id}: signals={len(data.get('signals', []))}, charts={len(data.get('charts', {}))}")
-        cursor = self.conn.cursor()
         json_str = json.dumps(data, ensure_ascii=False, default=str)
-        cursor.execute(
-            "UPDATE dashboard_runs SET run_data_json = ? WHERE run_id = ?",
-            (json_str, run_id)
-        )
-        self.conn.commit()
+        with self._write_lock:
+            cursor = self.conn.execute(SQL_SAVE_RUN_DATA, (json_str, run_id))
+            self.conn.commit()
         result = cursor.rowcount > 0
         logger.info(f"💾 Save result: {result}, JSON length: {len(json_str)}")
         return result
@@ -144,8 +313,7 @@ class DashboardDB:
     def get_run_data(self, run_id: str) -> Optional[Dict[str, Any]]:
         """获取运行的结构化数据"""
         import json
-        cursor = self.conn.cursor()
-        cursor.execute("SELECT run_data_json FROM dashboard_runs WHERE run_id = ?", (run_id,))
+        cursor = self._reader().execute(SQL_GET_RUN_DATA, (run_id,))
         row = cursor.fetchone()
         if row and row['run_data_json']:
             return json.loads(row['run_data_json'])
@@ -154,145 +322,219 @@ class DashboardDB:
     # ========== 步骤日志 ==========
     
     def add_step(self, step: DashboardStep) -> int:
-        """添加步骤日志"""
-        cursor = self.conn.cursor()
-        cursor.execute("""
-            INSERT INTO dashboard_steps (run_id, step_type, agent, content, timestamp)
-            VALUES (?, ?, ?, ?, ?)
-        """, (step.run_id, step.step_type, step.agent, step.content, step.timestamp))
-        self.conn.commit()
-        return cursor.lastrowid
+        """添加单条步骤日志 (add_steps 的薄封装)"""
+        return self.add_steps([step])
+
+    def add_steps(self, steps: List[DashboardStep]) -> int:
+        """批量添加步骤日志 - 单事务 executemany，N 条日志只付一次 commit 开销"""
+        if not steps:
+            return 0
+        with self._write_lock, self.conn:  # 隐式 BEGIN/COMMIT
+            self.conn.executemany(
+                SQL_INSERT_STEP,
+                [(s.run_id, s.step_type, s.agent, s.content, s.timestamp) for s in steps])
+        self._invalidate_cache()
+        self._maybe_optimize()
+        return len(steps)
     
-    def get_steps(self, run_id: str, limit: int = 500) -> List[DashboardStep]:
-        """获取运行的步骤日志"""
-        cursor = self.conn.cursor()
-        cursor.execute(
-            "SELECT * FROM dashboard_steps WHERE run_id = ? ORDER BY id DESC LIMIT ?",
-            (run_id, limit)
-        )
-        rows = cursor.fetchall()
-        return [DashboardStep(**dict(row)) for row in reversed(rows)]
+    def get_steps(self, run_id: str, limit: int = 500,
+                  since_id: Optional[int] = None) -> List[DashboardStep]:
+        """获取运行的步骤日志
+
+        传入 since_id (客户端已见的最大步骤 id) 时走 keyset 分页，
+        只返回增量步骤；否则返回最近 limit 条。
+        """
+        cache_key = (run_id, limit, since_id)
+        cached = self._steps_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+        cursor = self._reader().cursor()
+        cursor.row_factory = None  # 元组行，省去 Row 的按名查找
+        if since_id is not None:
+            cursor.execute(SQL_GET_STEPS_SINCE, (run_id, since_id, limit))
+        else:
+            cursor.execute(SQL_GET_STEPS, (run_id, limit))
+        # DB 行是可信数据，model_construct 跳过逐字段校验
+        steps = [
+            DashboardStep.model_construct(
+                id=step_id, run_id=step_run_id, step_type=step_type,
+                agent=agent, content=content, timestamp=timestamp)
+            for step_id, step_run_id, step_type, agent, content, timestamp in cursor
+        ]
+        if len(self._steps_cache) > 256:
+            self._steps_cache.clear()
+        self._steps_cache[cache_key] = steps
+        return steps
+
+    def iter_steps(self, run_id: str, limit: int = 500,
+                   since_id: Optional[int] = None) -> Iterator[DashboardStep]:
+        """流式产出步骤日志 - 游标逐批迭代，超长 run 不必一次性物化整个列表
+
+        StreamingResponse 的同步迭代器每次推进可能落在不同的工作线程上，
+        不能用按线程绑定的 _reader() 连接；这里开一条生成器自持的连接
+        (check_same_thread=False，生成器语义本身保证访问串行)，迭代结束
+        或生成器被关闭时随 finally 释放。
+        """
+        if str(self.db_path) == ":memory:":
+            # 内存库开不了第二条连接，退化为物化查询
+            yield from self.get_steps(run_id, limit, since_id)
+            return
+        conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        try:
+            conn.execute("PRAGMA busy_timeout=5000")
+            cursor = conn.cursor()
+            if since_id is not None:
+                cursor.execute(SQL_GET_STEPS_SINCE, (run_id, since_id, limit))
+            else:
+                cursor.execute(SQL_GET_STEPS, (run_id, limit))
+            while True:
+                batch = cursor.fetchmany(200)
+                if not batch:
+                    break
+                for step_id, step_run_id, step_type, agent, content, timestamp in batch:
+                    yield DashboardStep.model_construct(
+                        id=step_id, run_id=step_run_id, step_type=step_type,
+                        agent=agent, content=content, timestamp=timestamp)
+        finally:
+            conn.close()
     
     # ========== 历史记录 ==========
     
     def get_history(self, limit: int = 50, user_id: Optional[str] = None) -> List[HistoryItem]:
         """获取历史运行列表"""
-        cursor = self.conn.cursor()
-        
+        cache_key = ("get_history", limit, user_id)
+        cached = self._cache_get(cache_key)
+        if cached is not _CACHE_MISS:
+            return cached
+        return self._cache_put(cache_key, list(self.iter_history(limit, user_id)))
+
+    def iter_history(self, limit: int = 50, user_id: Optional[str] = None) -> Iterator[HistoryItem]:
+        """流式获取历史运行列表 - 按批次惰性产出，大 limit 场景不必一次性物化"""
+        # 持续时间 / 距今秒数直接在 SQL 中计算，避免每行两次 fromisoformat
         query_sql = """
-            SELECT run_id, query, status, started_at, finished_at, signal_count, parent_run_id, report_path
+            SELECT run_id, query, status, started_at, finished_at, signal_count, parent_run_id, report_path,
+                   CAST(strftime('%s', finished_at) - strftime('%s', started_at) AS INTEGER) AS duration_seconds,
+                   CAST(strftime('%s', 'now', 'localtime') - strftime('%s', started_at) AS INTEGER) AS age_seconds
             FROM dashboard_runs
         """
         params = []
-        
+
         if user_id:
             query_sql += " WHERE user_id = ?"
             params.append(user_id)
-            
+
         query_sql += " ORDER BY started_at DESC LIMIT ?"
         params.append(limit)
-        
+
+        cursor = self._reader().cursor()
+        cursor.row_factory = None  # 元组行，省去 Row 的按名查找
         cursor.execute(query_sql, tuple(params))
-        
-        items = []
-        now = datetime.now()
-        
-        for row in cursor.fetchall():
-            item = HistoryItem(**dict(row))
-            
-            # 计算持续时间
-            if item.started_at and item.finished_at:
-                try:
-                    start = datetime.fromisoformat(item.started_at)
-                    end = datetime.fromisoformat(item.finished_at)
-                    item.duration_seconds = int((end - start).total_seconds())
-                except:
-                    pass
-            
-            # 计算距今时间
-            if item.started_at:
-                try:
-                    start = datetime.fromisoformat(item.started_at)
-                    delta = now - start
-                    item.time_since_last_run = self._format_timedelta(delta)
-                except:
-                    pass
-            
-            items.append(item)
-        
-        return items
+
+        while True:
+            batch = cursor.fetchmany(100)
+            if not batch:
+                break
+            for (row_run_id, row_query, status, started_at, finished_at, signal_count,
+                 parent_run_id, report_path, duration_seconds, age_seconds) in batch:
+                item = HistoryItem.model_construct(
+                    run_id=row_run_id,
+                    query=row_query,
+                    status=status,
+                    started_at=started_at,
+                    finished_at=finished_at,
+                    signal_count=signal_count,
+                    parent_run_id=parent_run_id,
+                    report_path=report_path,
+                    duration_seconds=duration_seconds
+                )
+                if age_seconds is not None:
+                    item.time_since_last_run = self._format_timedelta(age_seconds)
+                yield item
     
     def get_query_groups(self, limit: int = 20, user_id: Optional[str] = None) -> List[QueryGroup]:
-        """按 Query 分组获取历史记录"""
-        cursor = self.conn.cursor()
-        
-        # 获取有 query 的运行，按 query 分组
-        where_clause = "WHERE query IS NOT NULL AND query != ''"
+        """按 Query 分组获取历史记录 - 单条 CTE 查询，避免每组一次回查的 N+1 模式"""
+        cache_key = ("get_query_groups", limit, user_id)
+        cached = self._cache_get(cache_key)
+        if cached is not _CACHE_MISS:
+            return cached
+
+        cursor = self._reader().cursor()
+        cursor.row_factory = None  # 元组行，省去 Row 的按名查找
+
+        group_filter = "WHERE query IS NOT NULL AND query != ''"
+        run_filter = ""
         params = []
-        
+
         if user_id:
-            where_clause += " AND user_id = ?"
+            group_filter += " AND user_id = ?"
+            run_filter = "WHERE r.user_id = ?"
             params.append(user_id)
-            
+
         params.append(limit)
-        
+        if user_id:
+            params.append(user_id)
+
         cursor.execute(f"""
-            SELECT query, COUNT(*) as run_count, MAX(started_at) as last_run_at
-            FROM dashboard_runs
-            {where_clause}
-            GROUP BY query
-            ORDER BY last_run_at DESC
-            LIMIT ?
-        """, tuple(params))
-        
-        groups = []
-        for row in cursor.fetchall():
-            query = row['query']
-            
-            # 获取该 query 的所有运行
-            # 获取该 query 的所有运行
-            run_query = """
-                SELECT run_id, query, status, started_at, finished_at, signal_count, parent_run_id, report_path
+            WITH top_q AS (
+                SELECT query, COUNT(*) AS run_count, MAX(started_at) AS last_run_at
                 FROM dashboard_runs
-                WHERE query = ?
-            """
-            run_params = [query]
-            
-            if user_id:
-                run_query += " AND user_id = ?"
-                run_params.append(user_id)
-                
-            run_query += " ORDER BY started_at DESC"
-            
-            cursor.execute(run_query, tuple(run_params))
-            
-            runs = [HistoryItem(**dict(r)) for r in cursor.fetchall()]
-            
-            groups.append(QueryGroup(
+                {group_filter}
+                GROUP BY query
+                ORDER BY last_run_at DESC
+                LIMIT ?
+            )
+            SELECT r.run_id, r.query, r.status, r.started_at, r.finished_at,
+                   r.signal_count, r.parent_run_id, r.report_path,
+                   t.run_count, t.last_run_at
+            FROM top_q t JOIN dashboard_runs r ON r.query = t.query
+            {run_filter}
+            ORDER BY t.last_run_at DESC, r.started_at DESC
+        """, tuple(params))
+
+        # 单次遍历，按 query 分桶 (结果已按组排序)
+        groups: Dict[str, QueryGroup] = {}
+        for (row_run_id, query, status, started_at, finished_at, signal_count,
+             parent_run_id, report_path, run_count, last_run_at) in cursor:
+            group = groups.get(query)
+            if group is None:
+                group = QueryGroup(
+                    query=query,
+                    run_count=run_count,
+                    runs=[],
+                    last_run_at=last_run_at
+                )
+                groups[query] = group
+            group.runs.append(HistoryItem.model_construct(
+                run_id=row_run_id,
                 query=query,
-                run_count=row['run_count'],
-                runs=runs,
-                last_run_at=row['last_run_at']
+                status=status,
+                started_at=started_at,
+                finished_at=finished_at,
+                signal_count=signal_count,
+                parent_run_id=parent_run_id,
+                report_path=report_path
             ))
-        
-        return groups
+
+        return self._cache_put(cache_key, list(groups.values()))
     
     def get_running_task(self) -> Optional[DashboardRun]:
         """获取当前正在运行的任务"""
-        cursor = self.conn.cursor()
-        cursor.execute(
-            "SELECT * FROM dashboard_runs WHERE status = 'running' ORDER BY started_at DESC LIMIT 1"
-        )
+        cache_key = ("get_running_task",)
+        cached = self._cache_get(cache_key)
+        if cached is not _CACHE_MISS:
+            return cached
+
+        cursor = self._reader().execute(SQL_GET_RUNNING)
         row = cursor.fetchone()
-        if row:
-            return DashboardRun(**dict(row))
-        return None
+        result = DashboardRun.model_construct(**dict(row)) if row else None
+        return self._cache_put(cache_key, result)
 
     def get_latest_run_by_query(self, query: str, user_id: Optional[str] = None) -> Optional[DashboardRun]:
         """获取指定 query 的最新运行记录"""
         if not query:
             return None
-        cursor = self.conn.cursor()
+        cursor = self._reader().cursor()
         
         sql = "SELECT * FROM dashboard_runs WHERE query = ?"
         params = [query]
@@ -306,13 +548,11 @@ class DashboardDB:
         cursor.execute(sql, tuple(params))
         row = cursor.fetchone()
         if row:
-            return DashboardRun(**dict(row))
+            return DashboardRun.model_construct(**dict(row))
         return None
     
-    def _format_timedelta(self, delta: timedelta) -> str:
-        """格式化时间差"""
-        total_seconds = int(delta.total_seconds())
-        
+    def _format_timedelta(self, total_seconds: int) -> str:
+        """格式化时间差 (秒)"""
         if total_seconds < 60:
             return "刚刚"
         elif total_seconds < 3600:
@@ -323,11 +563,92 @@ class DashboardDB:
             return f"{total_seconds // 86400} 天前"
 
 
+class AsyncDashboardDB:
+    """DashboardDB 的异步门面
+
+    所有 SQLite 调用移出事件循环线程执行，async 处理器中 await 即可。
+    步骤写入汇入单消费者队列，一次 drain 合并为一个 add_steps 批次，
+    既不阻塞事件循环又保持单写连接约定。
+    """
+
+    def __init__(self, db: Optional["DashboardDB"] = None):
+        self._db = db or get_db()
+        self._step_queue: Optional[asyncio.Queue] = None
+        self._writer_task: Optional[asyncio.Task] = None
+
+    async def add_step(self, step: DashboardStep):
+        """步骤写入进队列，由后台任务批量落盘"""
+        if self._writer_task is None or self._writer_task.done():
+            self._step_queue = asyncio.Queue()
+            self._writer_task = asyncio.create_task(self._drain_steps())
+        self._step_queue.put_nowait(step)
+
+    async def _drain_steps(self):
+        while True:
+            batch = [await self._step_queue.get()]
+            while not self._step_queue.empty():
+                batch.append(self._step_queue.get_nowait())
+            try:
+                await asyncio.to_thread(self._db.add_steps, batch)
+            except Exception as e:
+                logger.error(f"Async step flush failed: {e}")
+            finally:
+                # 写完 (或放弃) 才确认，join() 以此判定在途批次
+                for _ in batch:
+                    self._step_queue.task_done()
+
+    async def flush_steps(self):
+        """等待队列及在途批次全部落盘 (用于收尾/测试)"""
+        if self._step_queue is not None:
+            await self._step_queue.join()
+
+    async def create_run(self, run: DashboardRun) -> DashboardRun:
+        return await asyncio.to_thread(self._db.create_run, run)
+
+    async def get_run(self, run_id: str) -> Optional[DashboardRun]:
+        return await asyncio.to_thread(self._db.get_run, run_id)
+
+    async def update_run(self, run_id: str, **kwargs) -> bool:
+        return await asyncio.to_thread(lambda: self._db.update_run(run_id, **kwargs))
+
+    async def delete_run(self, run_id: str) -> bool:
+        return await asyncio.to_thread(self._db.delete_run, run_id)
+
+    async def save_run_data(self, run_id: str, data: Dict[str, Any]) -> bool:
+        return await asyncio.to_thread(self._db.save_run_data, run_id, data)
+
+    async def get_run_data(self, run_id: str) -> Optional[Dict[str, Any]]:
+        return await asyncio.to_thread(self._db.get_run_data, run_id)
+
+    async def get_steps(self, run_id: str, limit: int = 500,
+                        since_id: Optional[int] = None) -> List[DashboardStep]:
+        return await asyncio.to_thread(self._db.get_steps, run_id, limit, since_id)
+
+    async def get_history(self, limit: int = 50, user_id: Optional[str] = None) -> List[HistoryItem]:
+        return await asyncio.to_thread(self._db.get_history, limit, user_id)
+
+    async def get_query_groups(self, limit: int = 20, user_id: Optional[str] = None) -> List[QueryGroup]:
+        return await asyncio.to_thread(self._db.get_query_groups, limit, user_id)
+
+    async def get_running_task(self) -> Optional[DashboardRun]:
+        return await asyncio.to_thread(self._db.get_running_task)
+
+    async def get_latest_run_by_query(self, query: str, user_id: Optional[str] = None) -> Optional[DashboardRun]:
+        return await asyncio.to_thread(self._db.get_latest_run_by_query, query, user_id)
+
+
 # 全局单例
 _db: Optional[DashboardDB] = None
+_async_db: Optional[AsyncDashboardDB] = None
 
 def get_db() -> DashboardDB:
     global _db
     if _db is None:
         _db = DashboardDB()
     return _db
+
+def get_async_db() -> AsyncDashboardDB:
+    global _async_db
+    if _async_db is None:
+        _async_db = AsyncDashboardDB()
+    return _async_db
@@ -73,6 +73,11 @@ export function useWebSocket() {
 
     const handleMessage = (msg: { type: string; data: any }) => {
         switch (msg.type) {
+            case 'batch':
+                // 后端 20ms 内的事件合并为一帧，逐个分发
+                msg.data.forEach((event: any) => handleMessage(event))
+                break
+
             case 'init':
                 // 同步后端当前状态
                 const isActuallyRunning = msg.data.is_running === true
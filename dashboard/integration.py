@@ -3,63 +3,220 @@ AlphaEar Dashboard 集成层
 将 Dashboard WebSocket 与真实 AlphaEar 工作流连接
 """
 import asyncio
+import hashlib
+import re
+import weakref
 import threading
-from datetime import datetime
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
 import contextvars
 from typing import Optional, Callable, Dict, Any, List, Union
+import numpy as np
+import pandas as pd
 from loguru import logger
-from queue import Queue
+from queue import Queue, Empty
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait
 
 # Context Var to track current run_id in threads
 run_id_ctx = contextvars.ContextVar("run_id", default=None)
 
+# 事件批量刷新间隔 (秒) - 一个周期内的事件合并为一个 batch 帧
+_FLUSH_INTERVAL = 0.02
+
+# 意图解析缓存容量 (LRU)
+_INTENT_CACHE_SIZE = 256
+
+# 价格行解析正则 (模块级编译一次，行循环里直接用)
+_PRICE_LINE_RE = re.compile(r'(\d{4}-\d{2}-\d{2}).*?(\d+\.?\d*).*?(\d+\.?\d*).*?(\d+\.?\d*).*?(\d+\.?\d*)')
+
+# 工具调用 TTL 缓存：同一 URL / 同一 (ticker, 区间) 常在多个信号间重复出现，
+# 命中即省掉一次 HTTP；价格盘中会漂移，5 分钟后过期
+_TOOL_CACHE_TTL = 300.0
+_TOOL_CACHE_SIZE = 512
+_tool_cache: "OrderedDict[tuple, tuple]" = OrderedDict()
+_tool_cache_lock = threading.Lock()
+
+
+# Kronos 推理结果比普通工具调用贵得多，缓存窗口放宽到 15 分钟
+_FORECAST_CACHE_TTL = 900.0
+
+# 完整图表 payload 的缓存窗口：键里带最后交易日，收盘后同一输入 6 小时内直接复用
+_CHART_CACHE_TTL = 21600.0
+
+
+def _tool_cached(key: tuple, fetch: Callable, ttl: float = _TOOL_CACHE_TTL):
+    """按 key 缓存工具调用结果 (线程安全, LRU + TTL)；未命中时执行 fetch"""
+    now = time.time()
+    with _tool_cache_lock:
+        entry = _tool_cache.get(key)
+        if entry is not None and entry[0] > now:
+            _tool_cache.move_to_end(key)
+            return entry[1]
+    value = fetch()
+    with _tool_cache_lock:
+        _tool_cache[key] = (now + ttl, value)
+        while len(_tool_cache) > _TOOL_CACHE_SIZE:
+            _tool_cache.popitem(last=False)
+    return value
+
+
+# Kronos 预测器进程级单例：懒加载 + 加锁，chart 线程池并发首用时只初始化一次模型
+_predictor_singleton = None
+_predictor_lock = threading.Lock()
+
+
+def _get_predictor():
+    global _predictor_singleton
+    if _predictor_singleton is None:
+        with _predictor_lock:
+            if _predictor_singleton is None:
+                from utils.kronos_predictor import KronosPredictorUtility
+                _predictor_singleton = KronosPredictorUtility()
+    return _predictor_singleton
+
+
+def _forecast_cache_key(df, lookback: int, pred_len: int, news_text: Optional[str]) -> tuple:
+    """Kronos 预测的缓存键：模型输入只有最后 lookback 根 K 线和新闻文本"""
+    closes = pd.to_numeric(df['close'].tail(lookback), errors='coerce').to_numpy()
+    close_digest = hashlib.blake2b(closes.tobytes(), digest_size=8).hexdigest()
+    news_digest = hashlib.blake2b((news_text or '').encode(), digest_size=8).hexdigest()
+    return ("forecast", str(df['date'].iloc[-1])[:10], close_digest, lookback, pred_len, news_digest)
+
+
+def _search_id(url: Optional[str]) -> str:
+    """为无 id 的搜索结果生成稳定 id (blake2b 跨进程一致，内建 hash 受随机化影响)"""
+    return f"search_{hashlib.blake2b((url or '').encode(), digest_size=8).hexdigest()}"
+
+
+# KLinePoint 列表的批量序列化适配器 (懒初始化：schema 依赖工作流环境才可导入)
+_kline_adapter = None
+
+
+def _dump_klines(points) -> List[dict]:
+    """把 List[KLinePoint] 一次性转成可 JSON 序列化的 dict 列表"""
+    global _kline_adapter
+    if _kline_adapter is None:
+        from pydantic import TypeAdapter
+        from schema.models import KLinePoint
+        _kline_adapter = TypeAdapter(List[KLinePoint])
+    return _kline_adapter.dump_python(points)
+
 class DashboardCallback:
     """
     Dashboard 回调管理器
+
+    工作线程只往队列投递事件；事件循环上的 flusher 协程每 20ms 清空队列，
+    将积压事件合并成一个 batch 帧广播，避免每个 step/signal 单独发一帧。
     """
     def __init__(self):
         self._enabled = False
         self._loop: Optional[asyncio.AbstractEventLoop] = None
         self._broadcast_func: Optional[Callable] = None
-    
+        self._queue: Queue = Queue()
+        self._flusher_task: Optional[asyncio.Task] = None
+        # 秒级缓存的 ISO 时间戳 - step() 是热路径，datetime.now().isoformat() 太贵
+        self._ts_second: int = 0
+        self._ts_iso: str = ""
+        # 按 run_id 记录上次 phase (name, progress, 单调时间)，过滤重复/过密的更新
+        self._last_phase: Dict[Optional[str], tuple] = {}
+        # 按 (run_id, ticker) 记录上次图表指纹，跳过完全重复的图表帧
+        self._last_chart: Dict[tuple, tuple] = {}
+
     def enable(self, broadcast_func: Callable, loop: asyncio.AbstractEventLoop):
         self._enabled = True
         self._broadcast_func = broadcast_func
         self._loop = loop
+        # call_soon_threadsafe 比 run_coroutine_threadsafe 轻：
+        # 无需分配/链接 Future，fire-and-forget 场景的正确原语
+        loop.call_soon_threadsafe(self._start_flusher)
         logger.info("📡 Dashboard callback enabled")
-    
+
+    def _start_flusher(self):
+        """在事件循环线程上启动 flusher (循环线程串行执行，无竞争)"""
+        if self._flusher_task is None or self._flusher_task.done():
+            self._flusher_task = self._loop.create_task(self._flusher())
+
     def disable(self):
         self._enabled = False
         self._broadcast_func = None
         self._loop = None
-    
+        # 丢弃残留事件：此时已无广播通道，留在队列里会在下一次 enable 时
+        # 被 flusher 发出去，run_id 对不上而串进新 run 的上下文
+        try:
+            while True:
+                self._queue.get_nowait()
+        except Empty:
+            pass
+
+    async def drain(self):
+        """立即清空队列并广播积压事件
+
+        flusher 是 20ms 节拍；完成路径从 done.wait() 醒来后可能一路不让出
+        事件循环就走到 disable()，尾部事件会被闷在队列里。收尾前显式调用
+        一次，保证最后的 step/signal 既广播也进入落盘队列。
+        """
+        events = []
+        try:
+            while True:
+                events.append(self._queue.get_nowait())
+        except Empty:
+            pass
+        if not events or not self._broadcast_func:
+            return
+        try:
+            if len(events) == 1:
+                await self._broadcast_func(events[0])
+            else:
+                await self._broadcast_func({"type": "batch", "data": events})
+        except Exception as e:
+            logger.warning(f"Failed to send dashboard events: {e}")
+
+    async def _flusher(self):
+        """清空事件队列并广播 (运行在 dashboard 事件循环上)"""
+        while self._enabled:
+            await asyncio.sleep(_FLUSH_INTERVAL)
+            await self.drain()
+
     def _send_event(self, event_type: str, data: dict):
-        if not self._enabled or not self._broadcast_func or not self._loop:
+        if not self._enabled:
             return
-        
+
         # Inject run_id from context
         current_run_id = run_id_ctx.get()
         if current_run_id:
             data["run_id"] = current_run_id
-        
-        try:
-            asyncio.run_coroutine_threadsafe(
-                self._broadcast_func({"type": event_type, "data": data}),
-                self._loop
-            )
-        except Exception as e:
-            logger.warning(f"Failed to send dashboard event: {e}")
+
+        self._queue.put_nowait({"type": event_type, "data": data})
 
     # ... methods (phase, step, etc.) remain same as they call _send_event ...
     def phase(self, name: str, progress: int):
+        # 同名且进度变化不足 1% 的更新直接丢弃；同名更新再限到 ~5Hz (完成帧除外)
+        run_key = run_id_ctx.get()
+        now = time.monotonic()
+        last = self._last_phase.get(run_key)
+        if last is not None and last[0] == name:
+            if abs(progress - last[1]) < 1:
+                return
+            if now - last[2] < 0.2 and progress < 100:
+                return
+        self._last_phase[run_key] = (name, progress, now)
         self._send_event("progress", {"phase": name, "progress": progress})
     
+    def _timestamp(self) -> str:
+        """秒级精度的 ISO 时间戳，同一秒内复用已格式化的字符串"""
+        sec = int(time.time())
+        if sec != self._ts_second:
+            self._ts_second = sec
+            self._ts_iso = datetime.fromtimestamp(sec).isoformat()
+        return self._ts_iso
+
     def step(self, step_type: str, agent: str, content: str, **kwargs):
         self._send_event("step", {
             "type": step_type,
             "agent": agent,
             "content": content,
-            "timestamp": datetime.now().isoformat(),
+            "timestamp": self._timestamp(),
             **kwargs
         })
     
@@ -67,6 +224,18 @@ class DashboardCallback:
         self._send_event("signal", signal_data)
     
     def chart(self, ticker: str, data: dict):
+        # 图表帧很大 (30 根 K 线 + 预测)，同一 ticker 内容未变时不重发
+        prices = data.get("prices") or []
+        fingerprint = (
+            len(prices),
+            prices[-1].get("date") if prices else None,
+            prices[-1].get("close") if prices else None,
+            bool(data.get("forecast")),
+        )
+        chart_key = (run_id_ctx.get(), ticker)
+        if self._last_chart.get(chart_key) == fingerprint:
+            return
+        self._last_chart[chart_key] = fingerprint
         self._send_event("chart", {"ticker": ticker, **data})
     
     def prediction(self, ticker: str, prediction: dict):
@@ -86,28 +255,79 @@ class WorkflowRunner:
     
     def __init__(self):
         self._workflow = None
+        self._workflow_lock = threading.Lock()
         # Track active runs: run_id -> Thread
-        self._active_runs: Dict[str, threading.Thread] = {}
-        self._cancelled_flags: Dict[str, bool] = {}
+        # 弱引用：线程结束后条目可被 GC 回收，异常路径漏掉 pop 也不会泄漏
+        self._active_runs: "weakref.WeakValueDictionary[str, threading.Thread]" = weakref.WeakValueDictionary()
+        # 每个 run 一个 Event：is_set() 读取无需持锁，取消检查是最热的读路径
+        self._cancelled_events: Dict[str, threading.Event] = {}
+        # run 结束时的一次性通知回调 (server 端用它唤醒等待协程，替代轮询)
+        self._completion_callbacks: Dict[str, Callable] = {}
         self._lock = threading.Lock()
+        # 意图解析 LRU 缓存：同一查询 (及其改写) 重复提交时省掉一次 LLM 往返
+        self._intent_cache: "OrderedDict[str, dict]" = OrderedDict()
+        # Agent LLM 调用专用事件循环 (懒启动的守护线程)：所有 run 的并发分析
+        # 共享一个循环和连接池，而非各开线程栈
+        self._agent_loop: Optional[asyncio.AbstractEventLoop] = None
     
+    @staticmethod
+    def _normalize_query(query: str) -> str:
+        """归一化查询作为缓存键：小写、去标点、词序无关，吸收同义改写"""
+        tokens = re.findall(r"[\w一-鿿]+", query.lower())
+        return " ".join(sorted(tokens))
+
+    def _cached_intent(self, query: str) -> Optional[dict]:
+        key = self._normalize_query(query)
+        with self._lock:
+            cached = self._intent_cache.get(key)
+            if cached is not None:
+                self._intent_cache.move_to_end(key)
+                return dict(cached)
+        return None
+
+    def _store_intent(self, query: str, intent_info: dict):
+        with self._lock:
+            self._intent_cache[self._normalize_query(query)] = dict(intent_info)
+            while len(self._intent_cache) > _INTENT_CACHE_SIZE:
+                self._intent_cache.popitem(last=False)
+
+    def _ensure_agent_loop(self) -> asyncio.AbstractEventLoop:
+        """懒启动跑 LLM 协程的专用事件循环线程"""
+        if self._agent_loop is None:
+            with self._lock:
+                if self._agent_loop is None:
+                    loop = asyncio.new_event_loop()
+                    threading.Thread(
+                        target=loop.run_forever, daemon=True, name="agent-loop"
+                    ).start()
+                    self._agent_loop = loop
+        return self._agent_loop
+
     def _ensure_workflow(self):
+        # 双重检查锁：并发 run 同时启动时只初始化一次 (初始化很重)，
+        # 初始化完成后的快路径不付锁开销
         if self._workflow is None:
-            from main_flow import SignalFluxWorkflow
-            self._workflow = SignalFluxWorkflow(isq_template_id="default_isq_v1")
+            with self._workflow_lock:
+                if self._workflow is None:
+                    from main_flow import SignalFluxWorkflow
+                    self._workflow = SignalFluxWorkflow(isq_template_id="default_isq_v1")
         return self._workflow
     
     def is_running(self, run_id: str = None) -> bool:
         if run_id:
-            return run_id in self._active_runs and self._active_runs[run_id].is_alive()
+            thread = self._active_runs.get(run_id)
+            return thread is not None and thread.is_alive()
         return len(self._active_runs) > 0
     
     def is_cancelled(self, run_id: str) -> bool:
-        return self._cancelled_flags.get(run_id, False)
-    
+        event = self._cancelled_events.get(run_id)
+        return event is not None and event.is_set()
+
     def cancel(self, run_id: str):
         if run_id in self._active_runs:
-            self._cancelled_flags[run_id] = True
+            event = self._cancelled_events.get(run_id)
+            if event:
+                event.set()
             logger.info(f"⚠️ Workflow cancellation requested for {run_id}")
             return True
         return False
@@ -123,11 +343,12 @@ class WorkflowRunner:
         run_id: str = None, # Required for concurrency
         concurrency: int = 1
     ):
-        if run_id in self._active_runs and self._active_runs[run_id].is_alive():
+        existing = self._active_runs.get(run_id)
+        if existing is not None and existing.is_alive():
             raise RuntimeError(f"Run {run_id} is already active")
         
-        self._cancelled_flags[run_id] = False
-        
+        self._cancelled_events[run_id] = threading.Event()
+
         thread = threading.Thread(
             target=self._run_workflow_wrapper, # Use wrapper to set context
             args=(run_id, query, sources or ["financial"], wide, depth, run_state, user_id, concurrency),
@@ -151,7 +372,7 @@ class WorkflowRunner:
         if new_run_id in self._active_runs:
              raise RuntimeError(f"Run {new_run_id} is already active")
 
-        self._cancelled_flags[new_run_id] = False
+        self._cancelled_events[new_run_id] = threading.Event()
 
         thread = threading.Thread(
             target=self._run_update_wrapper,
@@ -162,6 +383,23 @@ class WorkflowRunner:
             self._active_runs[new_run_id] = thread
         thread.start()
 
+    def on_complete(self, run_id: str, callback: Callable):
+        """注册 run 结束时的一次性回调 (在工作线程上调用，须自行保证线程安全)"""
+        with self._lock:
+            self._completion_callbacks[run_id] = callback
+
+    def _finalize_run(self, run_id: str):
+        """run 收尾：清理跟踪状态并触发完成回调"""
+        with self._lock:
+            self._active_runs.pop(run_id, None)
+            self._cancelled_events.pop(run_id, None)
+            callback = self._completion_callbacks.pop(run_id, None)
+        if callback:
+            try:
+                callback()
+            except Exception as e:
+                logger.warning(f"Completion callback failed for {run_id}: {e}")
+
     def _run_workflow_wrapper(self, run_id: str, *args):
         # Set context var
         token = run_id_ctx.set(run_id)
@@ -169,19 +407,15 @@ class WorkflowRunner:
             self._run_workflow(run_id, *args)
         finally:
             run_id_ctx.reset(token)
-            with self._lock:
-                self._active_runs.pop(run_id, None)
-                self._cancelled_flags.pop(run_id, None)
-    
+            self._finalize_run(run_id)
+
     def _run_update_wrapper(self, run_id: str, *args):
         token = run_id_ctx.set(run_id)
         try:
             self._run_update(run_id, *args)
         finally:
             run_id_ctx.reset(token)
-            with self._lock:
-                self._active_runs.pop(run_id, None)
-                self._cancelled_flags.pop(run_id, None)
+            self._finalize_run(run_id)
 
 
     
@@ -198,10 +432,13 @@ class WorkflowRunner:
     ):
         """实际执行工作流（在后台线程中）- 完整复制 main_flow.py 逻辑"""
         cb = dashboard_callback
+        started_at = time.time()
         
+        cancelled_event = self._cancelled_events.get(run_id) or threading.Event()
+
         def check_cancelled():
-            """检查是否已取消"""
-            if self._cancelled_flags.get(run_id, False):
+            """检查是否已取消 (Event.is_set 无锁，可在热循环里频繁调用)"""
+            if cancelled_event.is_set():
                 cb.step("warning", "System", "⚠️ 工作流已取消")
                 raise InterruptedError("Workflow cancelled by user")
         
@@ -225,7 +462,13 @@ class WorkflowRunner:
             if query:
                 cb.step("thought", "IntentAgent", f"🧠 分析查询意图: {query}")
                 try:
-                    intent_info = workflow.intent_agent.run(query)
+                    intent_info = self._cached_intent(query)
+                    if intent_info is not None:
+                        cb.step("result", "IntentAgent", "💾 意图缓存命中，跳过 LLM 调用")
+                    else:
+                        intent_info = workflow.intent_agent.run(query)
+                        if isinstance(intent_info, dict):
+                            self._store_intent(query, intent_info)
                     if isinstance(intent_info, dict):
                         keywords = intent_info.get("keywords", [])
                         search_queries = intent_info.get("search_queries", [])
@@ -247,21 +490,30 @@ class WorkflowRunner:
             else:
                 actual_sources = sources
             
-            # 1.2 多源抓取
+            # 1.2 多源抓取 - 各源相互独立且纯网络 I/O，并发抓取把耗时从各源之和降到最慢一源
             cb.phase("多源抓取", 15)
             successful_sources = []
-            for source in actual_sources[:5]:  # 限制源数量
-                check_cancelled()  # 取消检查点
+            fetch_sources = actual_sources[:5]  # 限制源数量
+            check_cancelled()  # 取消检查点
+            for source in fetch_sources:
                 cb.step("tool_call", "TrendAgent", f"fetch_hot_news('{source}', count={wide})")
-                try:
-                    result = workflow.trend_agent.news_toolkit.fetch_hot_news(source, count=wide)
-                    if result and len(result) > 0:
-                        successful_sources.append(source)
-                        cb.step("result", "TrendAgent", f"✅ {source}: 获取 {len(result)} 条")
-                    else:
-                        cb.step("result", "TrendAgent", f"⚠️ {source}: 无数据")
-                except Exception as e:
-                    cb.step("error", "TrendAgent", f"❌ {source}: {str(e)[:50]}")
+            with ThreadPoolExecutor(max_workers=min(5, len(fetch_sources) or 1)) as fetch_pool:
+                fetch_futures = {
+                    fetch_pool.submit(workflow.trend_agent.news_toolkit.fetch_hot_news, source, count=wide): source
+                    for source in fetch_sources
+                }
+                for future in as_completed(fetch_futures):
+                    check_cancelled()  # 取消检查点
+                    source = fetch_futures[future]
+                    try:
+                        result = future.result()
+                        if result and len(result) > 0:
+                            successful_sources.append(source)
+                            cb.step("result", "TrendAgent", f"✅ {source}: 获取 {len(result)} 条")
+                        else:
+                            cb.step("result", "TrendAgent", f"⚠️ {source}: 无数据")
+                    except Exception as e:
+                        cb.step("error", "TrendAgent", f"❌ {source}: {str(e)[:50]}")
             
             # 1.3 主动搜索 (关键！有 query 时执行网络搜索)
             search_signals = []
@@ -273,24 +525,34 @@ class WorkflowRunner:
                     cb.phase("主动搜索", 22)
                     cb.step("thought", "TrendAgent", f"🔍 执行主动搜索: {search_queries[:2]}")
                     
-                    for q in search_queries[:2]:  # 限制查询数
-                        check_cancelled()  # 取消检查点
+                    # 两条搜索相互独立 (网络 I/O)，并发执行将本阶段耗时减半
+                    check_cancelled()  # 取消检查点
+                    active_queries = search_queries[:2]  # 限制查询数
+                    for q in active_queries:
                         cb.step("tool_call", "TrendAgent", f"search_list('{q}', max_results=5)  # 使用默认引擎")
-                        try:
-                            results = workflow.search_tools.search_list(q, max_results=5, enrich=True)  # 使用默认引擎
-                            for r in results:
-                                search_signals.append({
-                                    "title": r.get('title'),
-                                    "url": r.get('url'),
-                                    "source": r.get('source', 'Search'),
-                                    "content": r.get('content'),
-                                    "publish_time": r.get('publish_time') or datetime.now(),
-                                    "sentiment_score": r.get('sentiment_score', 0),
-                                    "id": r.get('id') or f"search_{hash(r.get('url') or '')}"
-                                })
-                            cb.step("result", "TrendAgent", f"✅ 搜索 '{q[:20]}...': {len(results)} 条")
-                        except Exception as e:
-                            cb.step("error", "TrendAgent", f"❌ 搜索失败: {str(e)[:50]}")
+                    with ThreadPoolExecutor(max_workers=2) as search_pool:
+                        search_futures = {
+                            search_pool.submit(workflow.search_tools.search_list, q, max_results=5, enrich=True): q
+                            for q in active_queries
+                        }
+                        for future in as_completed(search_futures):
+                            check_cancelled()  # 取消检查点
+                            q = search_futures[future]
+                            try:
+                                results = future.result()
+                                for r in results:
+                                    search_signals.append({
+                                        "title": r.get('title'),
+                                        "url": r.get('url'),
+                                        "source": r.get('source', 'Search'),
+                                        "content": r.get('content'),
+                                        "publish_time": r.get('publish_time') or datetime.now(),
+                                        "sentiment_score": r.get('sentiment_score', 0),
+                                        "id": r.get('id') or _search_id(r.get('url'))
+                                    })
+                                cb.step("result", "TrendAgent", f"✅ 搜索 '{q[:20]}...': {len(results)} 条")
+                            except Exception as e:
+                                cb.step("error", "TrendAgent", f"❌ 搜索失败: {str(e)[:50]}")
                     
                     cb.step("result", "TrendAgent", f"🔍 主动搜索共获取 {len(search_signals)} 条结果")
             
@@ -307,7 +569,27 @@ class WorkflowRunner:
             db_news = workflow.db.get_daily_news(limit=50) or []
             
             # 合并列表 (搜索结果优先)
-            raw_news = search_signals + db_news if search_signals else db_news
+            merged_news = search_signals + db_news if search_signals else db_news
+
+            # 按归一化标题去重：同一事件常被多个源转载，重复条目白白消耗筛选 token
+            # (搜索结果在前，保留的是优先级更高的那条)
+            seen_titles = set()
+            raw_news = []
+            for n in merged_news:
+                fp = hashlib.blake2b(
+                    re.sub(r'\W+', '', (n.get("title") or "").lower())[:80].encode(),
+                    digest_size=8
+                ).digest()
+                if fp in seen_titles:
+                    continue
+                seen_titles.add(fp)
+                raw_news.append(n)
+            if len(raw_news) < len(merged_news):
+                cb.step("thought", "TrendAgent", f"🧹 标题去重: {len(merged_news)} -> {len(raw_news)} 条")
+
+            # 预截断正文：分析分支会多次取用同一信号，不在热循环里反复切 3KB 字符串
+            for n in raw_news:
+                n["_truncated"] = (n.get("content") or "")[:3000]
             cb.step("thought", "TrendAgent", f"📊 合并数据: 搜索 {len(search_signals)} + 数据库 {len(db_news)} = {len(raw_news)} 条")
             
             if not raw_news:
@@ -341,51 +623,33 @@ class WorkflowRunner:
             cb.step("phase", "System", f"💼 --- Step 2: Financial Analysis ({len(high_value_signals)} signals) ---")
             
             analyzed_signals = []
+            pending_saves: List[dict] = []  # 入库攒一批，循环结束后单事务落盘
             total = len(high_value_signals)
+            # 行情区间只算一次，循环里每个 ticker 不再重复 strftime
+            end_date = datetime.now().strftime('%Y-%m-%d')
+            start_date = (datetime.now() - timedelta(days=60)).strftime('%Y-%m-%d')
             
-            for i, signal in enumerate(high_value_signals):
-                check_cancelled()  # 取消检查点
-                progress = 50 + int((i + 1) / total * 25)
-                cb.phase(f"分析信号 {i+1}/{total}", progress)
-                
-                title = signal.get('title', 'Unknown')[:30]
-                cb.step("thought", "FinAgent", f"📊 分析: {title}...")
-                
-                # 构造输入
-                content = signal.get("content") or ""
-                if len(content) < 50 and signal.get("url"):
-                    try:
-                        content = workflow.trend_agent.news_toolkit.fetch_news_content(signal["url"]) or ""
-                    except:
-                        pass
-                input_text = f"【{signal['title']}】\n{content[:3000]}"
-                
             # --- New Concurrency Logic Start ---
-            from concurrent.futures import ThreadPoolExecutor, as_completed
-            
-            def analyze_single_signal_integration(signal_data, index, total_count):
-                """Helper for integration.py concurrency"""
+            async def analyze_single_signal_integration(signal_data, index, total_count):
+                """Helper for integration.py concurrency (协程，跑在专用 agent loop 上)"""
                 try:
-                    # Progress update (approximate since async)
-                    # We can't easily update phase progress from thread accurately without lock or messing up order
-                    # But individual signal processing doesn't need strict ordered progress updates.
-                    # For simplicity, we skip granular progress update inside thread or just log.
-                    
-                    t_title = signal_data.get('title', 'Unknown')[:30]
-                    # cb.step("thought", "FinAgent", f"📊 [Parallel] Analyzing: {t_title}...") # Avoid thread race on cb? cb should be thread safe-ish via loop.call_soon_threadsafe
-                    
-                    # Reconstruct context
-                    s_content = signal_data.get("content") or ""
+                    # Reconstruct context (正文已在 1.5 合并时预截断)
+                    s_content = signal_data.get("_truncated") or ""
                     if len(s_content) < 50 and signal_data.get("url"):
                          try:
-                             s_content = workflow.trend_agent.news_toolkit.fetch_news_content(signal_data["url"]) or ""
+                             # 正文抓取仍是阻塞 HTTP，丢到线程避免卡住 agent loop
+                             s_content = (await asyncio.to_thread(
+                                 _tool_cached,
+                                 ("news", signal_data["url"]),
+                                 lambda: workflow.trend_agent.news_toolkit.fetch_news_content(signal_data["url"])
+                             ) or "")[:3000]
                          except:
                              pass
-                    s_input_text = f"【{signal_data['title']}】\n{s_content[:3000]}"
-                    
-                    # Run Analysis
-                    s_sig_obj = workflow.fin_agent.analyze_signal(s_input_text, news_id=signal_data.get("id"))
-                    
+                    s_input_text = f"【{signal_data['title']}】\n{s_content}"
+
+                    # Run Analysis (原生协程：LLM 等待期间不占线程)
+                    s_sig_obj = await workflow.fin_agent.analyze_signal_async(s_input_text, news_id=signal_data.get("id"))
+
                     if s_sig_obj:
                          # Source fallback
                         if not s_sig_obj.sources and signal_data.get("url"):
@@ -394,17 +658,31 @@ class WorkflowRunner:
                                 "url": signal_data["url"],
                                 "source_name": signal_data.get("source", "Unknown")
                             }]
-                        return s_sig_obj.dict(), s_sig_obj, signal_data
-                    return None, None, signal_data
+                        return s_sig_obj.dict(), s_sig_obj, signal_data, s_input_text
+                    return None, None, signal_data, s_input_text
                 except Exception as ex:
                     logger.error(f"Parallel analysis failed for {signal_data.get('title')}: {ex}")
-                    return None, None, signal_data
+                    return None, None, signal_data, None
 
             if concurrency > 1:
                 cb.step("status", "System", f"🚀 启动并发分析 (并发数: {concurrency})")
-                with ThreadPoolExecutor(max_workers=concurrency) as executor:
-                    futures = {executor.submit(analyze_single_signal_integration, sig, idx, total): sig for idx, sig in enumerate(high_value_signals)}
-                    
+                agent_loop = self._ensure_agent_loop()
+                limiter = asyncio.Semaphore(concurrency)
+                # 图表二级流水线：价格抓取 + Kronos 预测不阻塞信号分析的完成
+                chart_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="chart")
+                chart_futures = []
+
+                async def _bounded_analysis(sig_data, idx):
+                    async with limiter:
+                        return await analyze_single_signal_integration(sig_data, idx, total)
+
+                # run_coroutine_threadsafe 返回 concurrent.futures.Future，
+                # 下面的 as_completed 消费逻辑保持不变
+                futures = {
+                    asyncio.run_coroutine_threadsafe(_bounded_analysis(sig, idx), agent_loop): sig
+                    for idx, sig in enumerate(high_value_signals)
+                }
+                try:
                     completed_count = 0
                     for future in as_completed(futures):
                         try:
@@ -413,40 +691,25 @@ class WorkflowRunner:
                             progress = 50 + int(completed_count / total * 25)
                             cb.phase(f"分析信号 {completed_count}/{total}", progress)
                             
-                            sig_dict_res, sig_obj_res, original_sig = future.result()
+                            sig_dict_res, sig_obj_res, original_sig, s_input_text = future.result()
                             
                             if sig_dict_res and sig_obj_res:
                                 analyzed_signals.append(sig_dict_res)
+                                # signal 事件已携带完整 ISQ 字段，不再补发一条摘要 step 帧
                                 cb.signal(sig_dict_res)
-                                
-                                # Logs & Steps
-                                isq_str_res = f"I={sig_obj_res.intensity}, S={sig_obj_res.sentiment_score:.2f}, C={sig_obj_res.confidence:.2f}"
-                                cb.step("signal", "FinAgent", f"📊 {original_sig.get('title')[:20]}... ISQ: {isq_str_res}")
-                                
-                                # Tickers & Charts
+
+
+                                # Tickers & Charts - 提交到二级线程池，消费循环不等图表 HTTP
                                 for ticker in sig_obj_res.impact_tickers[:2]:
                                     ticker_code = ticker.get("ticker", "")
                                     ticker_name = ticker.get("name", "")
                                     if ticker_code:
-                                        # cb.step("result", "FinAgent", f"→ {ticker_name} ({ticker_code})")
-                                        # Fetch chart (sync in thread is fine)
-                                        try:
-                                            from datetime import timedelta
-                                            e_date = datetime.now().strftime('%Y-%m-%d')
-                                            s_date = (datetime.now() - timedelta(days=60)).strftime('%Y-%m-%d')
-                                            df_res = workflow.trend_agent.stock_toolkit._stock_tools.get_stock_price(ticker_code, s_date, e_date)
-                                            if df_res is not None and not df_res.empty:
-                                                # Need input text for prediction
-                                                s_c = original_sig.get("content") or "" 
-                                                # (Simplified content retrieval again? or pass it out. Let's re-use simple one)
-                                                c_input = f"【{original_sig['title']}】\n{s_c[:3000]}"
-                                                
-                                                chart_data_res = self._format_chart_from_df(
-                                                    ticker_code, ticker_name, df_res, news_text=c_input, prediction_logic=sig_obj_res.summary
-                                                )
-                                                cb.chart(ticker_code, chart_data_res)
-                                        except Exception as chart_e:
-                                             logger.warning(f"Chart failed: {chart_e}")
+                                        chart_futures.append(chart_executor.submit(
+                                            self._fetch_and_emit_chart,
+                                            run_id, workflow, ticker_code, ticker_name,
+                                            s_input_text, sig_obj_res.summary,
+                                            start_date, end_date
+                                        ))
 
                                 # Graph
                                 if sig_obj_res.transmission_chain:
@@ -457,10 +720,17 @@ class WorkflowRunner:
                                 sig_dict_res["user_id"] = user_id
                                 if user_id and sig_dict_res.get("signal_id"):
                                      sig_dict_res["signal_id"] = f"{sig_dict_res['signal_id']}_{user_id}"
-                                workflow.db.save_signal(sig_dict_res)
+                                pending_saves.append(sig_dict_res)
                             
                         except Exception as thread_e:
                             cb.step("error", "FinAgent", f"❌ Thread Error: {thread_e}")
+                finally:
+                    # 异常退出 (如取消) 时撤销还没跑起来的协程
+                    for pending in futures:
+                        pending.cancel()
+                    # 给在途图表一个有限的收尾窗口，不让慢行情接口拖住整个 run
+                    wait(chart_futures, timeout=30)
+                    chart_executor.shutdown(wait=False, cancel_futures=True)
 
             else:
                 # Sequential Loop (Original)
@@ -472,14 +742,17 @@ class WorkflowRunner:
                     title = signal.get('title', 'Unknown')[:30]
                     cb.step("thought", "FinAgent", f"📊 分析: {title}...")
                     
-                    # 构造输入
-                    content = signal.get("content") or ""
+                    # 构造输入 (正文已在 1.5 合并时预截断)
+                    content = signal.get("_truncated") or ""
                     if len(content) < 50 and signal.get("url"):
                         try:
-                            content = workflow.trend_agent.news_toolkit.fetch_news_content(signal["url"]) or ""
+                            content = (_tool_cached(
+                                ("news", signal["url"]),
+                                lambda: workflow.trend_agent.news_toolkit.fetch_news_content(signal["url"])
+                            ) or "")[:3000]
                         except:
                             pass
-                    input_text = f"【{signal['title']}】\n{content[:3000]}"
+                    input_text = f"【{signal['title']}】\n{content}"
                     
                     try:
                         # 调用 FinAgent
@@ -498,13 +771,10 @@ class WorkflowRunner:
                             sig_dict = sig_obj.dict()
                             analyzed_signals.append(sig_dict)
                             
-                            # 推送信号到 Dashboard
+                            # 推送信号到 Dashboard (signal 事件已携带完整 ISQ 字段)
                             cb.signal(sig_dict)
-                            
-                            # ISQ 评分
-                            isq_str = f"I={sig_obj.intensity}, S={sig_obj.sentiment_score:.2f}, C={sig_obj.confidence:.2f}"
-                            cb.step("signal", "FinAgent", f"📊 ISQ: {isq_str}")
-                            
+
+
                             # 推送标的信息
                             for ticker in sig_obj.impact_tickers[:2]:
                                 ticker_code = ticker.get("ticker", "")
@@ -514,11 +784,12 @@ class WorkflowRunner:
                                     
                                     # 尝试获取价格数据推送图表
                                     try:
-                                        from datetime import timedelta
-                                        end_date = datetime.now().strftime('%Y-%m-%d')
-                                        start_date = (datetime.now() - timedelta(days=60)).strftime('%Y-%m-%d')
                                         # 使用底层 StockTools 获取 DataFrame，而非 Toolkit 的 markdown 输出
-                                        df = workflow.trend_agent.stock_toolkit._stock_tools.get_stock_price(ticker_code, start_date, end_date)
+                                        # (start_date/end_date 已在循环外算好)
+                                        df = _tool_cached(
+                                            ("price", ticker_code, start_date, end_date),
+                                            lambda: workflow.trend_agent.stock_toolkit._stock_tools.get_stock_price(ticker_code, start_date, end_date)
+                                        )
                                         if df is not None and not df.empty:
                                             # Pass full signal content for news-aware prediction
                                             chart_data = self._format_chart_from_df(
@@ -545,14 +816,17 @@ class WorkflowRunner:
                             sig_dict["user_id"] = user_id
                             if user_id and sig_dict.get("signal_id"):
                                  sig_dict["signal_id"] = f"{sig_dict['signal_id']}_{user_id}"
-                            workflow.db.save_signal(sig_dict)
+                            pending_saves.append(sig_dict)
                         else:
                             cb.step("warning", "FinAgent", f"⚠️ 无法解析: {title}")
                             
                     except Exception as e:
                         cb.step("error", "FinAgent", f"❌ 分析失败: {str(e)[:50]}")
             # --- Concurrency Logic End ---
-            
+
+            if pending_saves:
+                workflow.db.save_signal_many(pending_saves)
+
             if not analyzed_signals:
                 cb.phase("完成", 100)
                 cb.step("warning", "System", "⚠️ 分析未产出有效信号")
@@ -582,19 +856,26 @@ class WorkflowRunner:
                 cb.step("thought", "ReportAgent", "生成章节内容...")
                 cb.step("thought", "ReportAgent", "渲染图表...")
                 
-                # 保存报告
-                from utils.md_to_html import save_report_as_html
+                # 保存报告：HTML 直接由内存中的 md 渲染，省掉临时文件的写后重读
+                from utils.md_to_html import save_report_as_html_str
                 import os
-                
+
                 report_dir = "reports"
                 os.makedirs(report_dir, exist_ok=True)
                 timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
                 md_filename = f"{report_dir}/daily_report_{timestamp}_{run_id[:6]}.md"
-                
-                with open(md_filename, "w", encoding="utf-8") as f:
-                    f.write(md_content)
-                
-                html_filename = save_report_as_html(md_filename)
+
+                # .md 仅作归档，后台线程落盘即可
+                def _archive_md(path=md_filename, content=md_content):
+                    try:
+                        with open(path, "w", encoding="utf-8") as f:
+                            f.write(content)
+                    except Exception as archive_e:
+                        logger.warning(f"Failed to archive markdown report: {archive_e}")
+
+                threading.Thread(target=_archive_md, daemon=True).start()
+
+                html_filename = save_report_as_html_str(md_content, md_filename.replace(".md", ".html"))
                 
                 cb.step("result", "ReportAgent", f"📄 报告已保存: {html_filename or md_filename}")
                 
@@ -608,7 +889,7 @@ class WorkflowRunner:
             # 完成
             cb.phase("完成", 100)
             cb.step("system", "System", "✅ AlphaEar 分析完成！")
-            cb.step("result", "System", f"📊 信号: {len(analyzed_signals)} | 耗时: ~{datetime.now().strftime('%H:%M:%S')}")
+            cb.step("result", "System", f"📊 信号: {len(analyzed_signals)} | 耗时: ~{int(time.time() - started_at)}s")
             
             if run_state:
                 run_state.status = "completed"
@@ -677,49 +958,82 @@ class WorkflowRunner:
         finally:
             pass
     
+    def _fetch_and_emit_chart(self, run_id: str, workflow, ticker_code: str, ticker_name: str,
+                              news_text: Optional[str], prediction_logic: Optional[str],
+                              s_date: str, e_date: str):
+        """图表二级流水线入口：拉价格、格式化 (含 Kronos 预测)、推送 (在 chart 线程池中执行)"""
+        token = run_id_ctx.set(run_id)
+        try:
+            df = _tool_cached(
+                ("price", ticker_code, s_date, e_date),
+                lambda: workflow.trend_agent.stock_toolkit._stock_tools.get_stock_price(ticker_code, s_date, e_date)
+            )
+            if df is not None and not df.empty:
+                # 整个格式化结果 (价格 + 预测 + 逻辑) 按输入缓存：重复标的在多个
+                # 信号/run 间很常见，命中时省掉 pandas 格式化和 Kronos 推理
+                news_digest = hashlib.blake2b((news_text or '').encode(), digest_size=8).hexdigest()
+                logic_digest = hashlib.blake2b((prediction_logic or '').encode(), digest_size=8).hexdigest()
+                chart_data = _tool_cached(
+                    ("chart", ticker_code, str(df['date'].iloc[-1])[:10], news_digest, logic_digest),
+                    lambda: self._format_chart_from_df(
+                        ticker_code, ticker_name, df,
+                        news_text=news_text, prediction_logic=prediction_logic
+                    ),
+                    ttl=_CHART_CACHE_TTL
+                )
+                dashboard_callback.chart(ticker_code, chart_data)
+        except Exception as e:
+            logger.warning(f"Chart failed for {ticker_code}: {e}")
+        finally:
+            run_id_ctx.reset(token)
+
     def _format_chart_from_df(self, ticker: str, name: str, df, news_text: Optional[str] = None, prediction_logic: Optional[str] = None) -> dict:
         """从 DataFrame 格式化价格数据为图表格式（推荐方法），包含预测"""
-        import pandas as pd
         price_list = []
+
+        # 取最近30条数据 - 整列向量化转换，避免 iterrows 逐行装箱
+        try:
+            sub = df.tail(30)[['date', 'open', 'high', 'low', 'close', 'volume']].copy()
+            dates = pd.to_datetime(sub['date'], errors='coerce').dt.strftime('%Y-%m-%d')
+            # 解析失败的日期退回字符串截断 (与原逐行逻辑一致)
+            sub['date'] = dates.fillna(sub['date'].astype(str).str[:10])
+            ohlc = ['open', 'high', 'low', 'close']
+            # astype(object) 把 numpy 标量落回内建 float/int，保证可直接 JSON 序列化
+            sub[ohlc] = sub[ohlc].apply(pd.to_numeric, errors='coerce').fillna(0.0).astype('float64').astype(object)
+            sub['volume'] = pd.to_numeric(sub['volume'], errors='coerce').fillna(0).astype('int64').astype(object)
+            price_list = sub.to_dict(orient='records')
+        except Exception as e:
+            logger.warning(f"Error formatting price data: {e}")
+            price_list = []
         
-        # 取最近30条数据
-        df_recent = df.tail(30)
-        
-        for _, row in df_recent.iterrows():
-            try:
-                # 处理日期格式
-                date_val = row.get('date', '')
-                if hasattr(date_val, 'strftime'):
-                    date_str = date_val.strftime('%Y-%m-%d')
-                else:
-                    date_str = str(date_val)[:10]  # 确保只取日期部分
-                
-                price_list.append({
-                    "date": date_str,
-                    "open": float(row.get('open', 0)),
-                    "high": float(row.get('high', 0)),
-                    "low": float(row.get('low', 0)),
-                    "close": float(row.get('close', 0)),
-                    "volume": int(row.get('volume', 0))
-                })
-            except Exception as e:
-                logger.warning(f"Error formatting price row: {e}")
-                continue
-        
-        # 尝试获取 Kronos 预测
+        # 尝试获取 Kronos 预测 - news/base 两种条件一次取齐，共享切片与新闻编码
         prediction = None
+        forecast_points = None
+        base_points = None
         try:
-            from utils.kronos_predictor import KronosPredictorUtility
-            predictor = KronosPredictorUtility()
-            # Pass news_text to the predictor
-            forecast_points = predictor.get_base_forecast(df, lookback=20, pred_len=5, news_text=news_text)
+            predictor = _get_predictor()
+            # 模型只看最后 lookback 根 K 线，预先裁掉多余历史，
+            # 省得把几百行的 DataFrame 整个拷进预测器再切片
+            df_model = df.tail(60).reset_index(drop=True)
+            if news_text:
+                forecast_points, base_points = _tool_cached(
+                    _forecast_cache_key(df_model, 20, 5, news_text) + ("pair",),
+                    lambda: predictor.get_forecasts_batch(df_model, lookback=20, pred_len=5, news_texts=[news_text, None]),
+                    ttl=_FORECAST_CACHE_TTL
+                )
+            else:
+                forecast_points = _tool_cached(
+                    _forecast_cache_key(df_model, 20, 5, None),
+                    lambda: predictor.get_base_forecast(df_model, lookback=20, pred_len=5, news_text=None),
+                    ttl=_FORECAST_CACHE_TTL
+                )
             if forecast_points and len(forecast_points) > 0:
                 # 计算预测涨跌幅
                 last_close = price_list[-1]["close"] if price_list else 0
                 if last_close > 0:
-                    pred_closes = [p.close for p in forecast_points]
-                    min_close = min(pred_closes)
-                    max_close = max(pred_closes)
+                    pred_closes = np.fromiter((p.close for p in forecast_points), dtype=np.float64)
+                    min_close = float(pred_closes.min())
+                    max_close = float(pred_closes.max())
                     target_low = round(((min_close - last_close) / last_close) * 100, 1)
                     target_high = round(((max_close - last_close) / last_close) * 100, 1)
                     prediction = {
@@ -740,40 +1054,18 @@ class WorkflowRunner:
             result["prediction"] = prediction
             
         # Serialize full forecast points for visualization if available
-        if 'forecast_points' in locals() and forecast_points:
-             try:
-                forecast_list = []
-                for p in forecast_points:
-                    forecast_list.append({
-                        "date": p.date, 
-                        "open": p.open,
-                        "high": p.high,
-                        "low": p.low,
-                        "close": p.close,
-                        "volume": p.volume
-                    })
-                result["forecast"] = forecast_list
-             except Exception as e:
-                 logger.warning(f"Failed to serialize forecast: {e}")
+        if forecast_points:
+            try:
+                result["forecast"] = _dump_klines(forecast_points)
+            except Exception as e:
+                logger.warning(f"Failed to serialize forecast: {e}")
 
-        # Try to get base forecast (without news) if news_text is provided
-        if news_text:
+        # Base forecast (without news) 已随批量调用取回，这里只做序列化
+        if base_points:
             try:
-                base_points = predictor.get_base_forecast(df, lookback=20, pred_len=5, news_text=None)
-                if base_points:
-                    base_list = []
-                    for p in base_points:
-                        base_list.append({
-                            "date": p.date,
-                            "open": p.open,
-                            "high": p.high,
-                            "low": p.low,
-                            "close": p.close,
-                            "volume": p.volume
-                        })
-                    result["forecast_base"] = base_list
+                result["forecast_base"] = _dump_klines(base_points)
             except Exception as e:
-                logger.warning(f"Failed to get base forecast: {e}")
+                logger.warning(f"Failed to serialize base forecast: {e}")
 
         if prediction_logic:
             result["prediction_logic"] = prediction_logic
@@ -786,10 +1078,9 @@ class WorkflowRunner:
         
         if isinstance(prices, str):
             # 解析字符串格式
-            import re
             lines = prices.strip().split('\n')
             for line in lines:
-                match = re.search(r'(\d{4}-\d{2}-\d{2}).*?(\d+\.?\d*).*?(\d+\.?\d*).*?(\d+\.?\d*).*?(\d+\.?\d*)', line)
+                match = _PRICE_LINE_RE.search(line)
                 if match:
                     price_list.append({
                         "date": match.group(1),
@@ -800,6 +1091,19 @@ class WorkflowRunner:
                         "volume": 0
                     })
         elif isinstance(prices, list):
+            # 快速路径：已是目标结构 (dict 列表、字段齐全且类型正确) 时直接复用，
+            # 不逐行重建 dict — 来自 _format_chart_from_df 的数据都走这条路
+            if all(
+                isinstance(p, dict)
+                and isinstance(p.get("date"), str)
+                and isinstance(p.get("open"), float)
+                and isinstance(p.get("high"), float)
+                and isinstance(p.get("low"), float)
+                and isinstance(p.get("close"), float)
+                and isinstance(p.get("volume"), int)
+                for p in prices
+            ):
+                return {"ticker": ticker, "name": name, "prices": prices[-30:]}
             for p in prices:
                 if isinstance(p, dict):
                     price_list.append({
@@ -819,40 +1123,38 @@ class WorkflowRunner:
     
     def _build_graph(self, signal) -> dict:
         """从 InvestmentSignal 构建传导图"""
-        nodes = []
-        edges = []
-        
-        for i, node in enumerate(signal.transmission_chain):
-            node_id = f"n{i}"
-            node_type = "event" if i == 0 else "impact"
-            nodes.append({
-                "id": node_id,
+        chain = signal.transmission_chain
+        tickers = signal.impact_tickers[:3]
+        last_chain_id = f"n{len(chain) - 1}" if chain else "n0"
+
+        nodes = [
+            {
+                "id": f"n{i}",
                 "label": node.node_name,
-                "type": node_type,
+                "type": "event" if i == 0 else "impact",
                 "impact": node.impact_type
-            })
-            if i > 0:
-                edges.append({
-                    "from": f"n{i-1}",
-                    "to": node_id,
-                    "label": node.impact_type
-                })
-        
+            }
+            for i, node in enumerate(chain)
+        ]
+        edges = [
+            {"from": f"n{i-1}", "to": f"n{i}", "label": node.impact_type}
+            for i, node in enumerate(chain) if i > 0
+        ]
+
         # 添加标的
-        for j, ticker in enumerate(signal.impact_tickers[:3]):
-            ticker_id = f"t{j}"
-            nodes.append({
-                "id": ticker_id,
+        nodes.extend(
+            {
+                "id": f"t{j}",
                 "label": f"{ticker.get('name', '')} ({ticker.get('ticker', '')})",
                 "type": "stock"
-            })
-            if nodes:
-                edges.append({
-                    "from": f"n{len(signal.transmission_chain)-1}" if signal.transmission_chain else "n0",
-                    "to": ticker_id,
-                    "label": ""
-                })
-        
+            }
+            for j, ticker in enumerate(tickers)
+        )
+        edges.extend(
+            {"from": last_chain_id, "to": f"t{j}", "label": ""}
+            for j in range(len(tickers))
+        )
+
         return {"nodes": nodes, "edges": edges}
 
 
@@ -6,6 +6,7 @@ import asyncio
 import json
 import os
 import sys
+import time
 from datetime import datetime, timedelta
 from pathlib import Path
 from typing import Optional, List, Dict, Any
@@ -16,18 +17,26 @@ sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
 
 from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse, HTMLResponse
+from fastapi.responses import FileResponse, HTMLResponse, JSONResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 import uvicorn
 
 from dotenv import load_dotenv
 load_dotenv()
 
+from pydantic import TypeAdapter
+
 from .models import RunRequest, RunResponse, DashboardRun, DashboardStep, HistoryItem, QueryGroup, UserRegister, UserLogin, Token, User
-from .db import get_db
+from .db import get_db, get_async_db
 from utils.database_manager import DatabaseManager
 from utils.news_tools import NewsNowTools
 
+# 列表批量序列化适配器 (模块级缓存)：一次 dump_python 走 pydantic-core，
+# 比逐项 model_dump 的 Python 循环快得多，步骤日志动辄几百条
+_steps_adapter = TypeAdapter(List[DashboardStep])
+_history_adapter = TypeAdapter(List[HistoryItem])
+_groups_adapter = TypeAdapter(List[QueryGroup])
+
 from fastapi.security import OAuth2PasswordBearer
 from fastapi import Depends, status
 from passlib.context import CryptContext
@@ -75,6 +84,42 @@ async def get_current_user(token: str = Depends(oauth2_scheme)):
 
 
 
+# 每连接出站队列容量；塞满说明客户端长时间收不动，直接断开
+_OUT_QUEUE_SIZE = 1000
+
+# 秒级缓存的 ISO 时间戳：datetime.now().isoformat() 每次都要走一遍 localtime，
+# 步骤时间戳回退等高频路径同一秒内直接复用
+_ts_cache: list = [0, ""]
+
+
+def iso_now() -> str:
+    now = int(time.time())
+    if now != _ts_cache[0]:
+        _ts_cache[0] = now
+        _ts_cache[1] = datetime.now().isoformat(timespec="seconds")
+    return _ts_cache[1]
+
+
+# 空闲态 init 帧内容恒定，进程启动时编码一次，连接时直接 send_text
+_IDLE_INIT_PAYLOAD = json.dumps({
+    "type": "init",
+    "data": {
+        "run_id": None,
+        "status": "idle",
+        "query": None,
+        "steps": [],
+        "signals": [],
+        "charts": {},
+        "graph": {}
+    }
+}, ensure_ascii=False)
+
+_IDLE_STATUS_PAYLOAD = json.dumps({
+    "type": "init",
+    "data": {"status": "idle", "is_running": False}
+}, ensure_ascii=False)
+
+
 # ============ 全局状态管理 ============
 class RunContext:
     """单个运行的状态上下文"""
@@ -98,12 +143,17 @@ class RunState:
         # Map run_id -> RunContext
         self.runs: Dict[str, RunContext] = {}
         
-        # Map user_id -> List[WebSocket]
-        self.user_connections: Dict[str, List[WebSocket]] = {}
-        
+        # Map user_id -> Set[WebSocket] (集合：挂断清理是 O(1) discard 而非线性 remove)
+        self.user_connections: Dict[str, set] = {}
+
         # Map run_id -> user_id (Quick lookup for routing)
         self.active_run_owners: Dict[str, str] = {}
-    
+
+        # 每连接一个出站队列 + 写任务：broadcast 只做 put_nowait，
+        # 卡住的客户端最多塞满自己的队列，不会拖住工作流回调
+        self._out_queues: Dict[WebSocket, asyncio.Queue] = {}
+        self._writer_tasks: Dict[WebSocket, asyncio.Task] = {}
+
     def get_run(self, run_id: str) -> Optional[RunContext]:
         return self.runs.get(run_id)
 
@@ -112,24 +162,41 @@ class RunState:
         self.runs[run_id] = ctx
         self.active_run_owners[run_id] = str(user_id)
         return ctx
-    
+
     def add_connection(self, user_id: str, websocket: WebSocket):
-        if user_id not in self.user_connections:
-            self.user_connections[user_id] = []
-        self.user_connections[user_id].append(websocket)
-        
+        self.user_connections.setdefault(user_id, set()).add(websocket)
+        queue: asyncio.Queue = asyncio.Queue(maxsize=_OUT_QUEUE_SIZE)
+        self._out_queues[websocket] = queue
+        self._writer_tasks[websocket] = asyncio.create_task(
+            self._connection_writer(user_id, websocket, queue))
+
+    async def _connection_writer(self, user_id: str, websocket: WebSocket, queue: asyncio.Queue):
+        """单连接写循环：串行清空该连接的出站队列"""
+        try:
+            while True:
+                payload = await queue.get()
+                await websocket.send_text(payload)
+        except Exception:
+            self.remove_connection(user_id, websocket)
+
     def remove_connection(self, user_id: str, websocket: WebSocket):
-        if user_id in self.user_connections:
-            if websocket in self.user_connections[user_id]:
-                self.user_connections[user_id].remove(websocket)
+        connections = self.user_connections.get(user_id)
+        if connections is not None:
+            connections.discard(websocket)
+        self._out_queues.pop(websocket, None)
+        task = self._writer_tasks.pop(websocket, None)
+        if task is not None and not task.done():
+            task.cancel()
 
     async def broadcast(self, message: dict):
         """精准广播：根据 message 中的 run_id 路由给特定用户"""
         data = message.get("data", {})
         target_user_id = None
-        
-        # 1. 尝试从消息中获取 run_id
-        run_id = data.get("run_id") if isinstance(data, dict) else None
+
+        # 1. 尝试从消息中获取 run_id (batch 帧在顶层携带 run_id)
+        run_id = message.get("run_id")
+        if not run_id:
+            run_id = data.get("run_id") if isinstance(data, dict) else None
         
         if run_id:
             # 2. 查找 run owner
@@ -150,15 +217,27 @@ class RunState:
             # 如果没有 run_id，无法确定目标用户
             return 
 
-        target_connections = self.user_connections.get(str(target_user_id), [])
-        
+        target_connections = self.user_connections.get(str(target_user_id))
+        if not target_connections:
+            return
+
+        # 只序列化一次，所有连接复用同一份文本 (send_json 会按连接重复 dumps)；
+        # ensure_ascii=False 让中文按 UTF-8 原样传输，payload 明显更小
+        payload = json.dumps(message, ensure_ascii=False, default=str)
+
+        # 入队即返回：实际发送由各连接的写任务完成，广播端零阻塞。
+        # 队列满说明客户端长时间收不动，按慢消费者断开
         dead_connections = []
-        for ws in target_connections:
+        for ws in list(target_connections):
+            queue = self._out_queues.get(ws)
+            if queue is None:
+                continue
             try:
-                await ws.send_json(message)
-            except:
+                queue.put_nowait(payload)
+            except asyncio.QueueFull:
+                logger.warning("🐌 WebSocket client too slow, dropping connection")
                 dead_connections.append(ws)
-        
+
         # Cleanup
         for ws in dead_connections:
             self.remove_connection(str(target_user_id), ws)
@@ -191,9 +270,13 @@ async def lifespan(app: FastAPI):
     ╚═══════════════════════════════════════════════════════════╝
     """)
     # Ensure DB tables exist on startup
-    db = DatabaseManager() 
+    db = DatabaseManager()
     db.close()
-    
+    # 预热 dashboard DB 单例：建表/WAL 设置在启动时完成，
+    # 首个请求不再付一次初始化开销
+    get_db()
+    get_async_db()
+
     yield
     print("👋 Dashboard shutting down")
 
@@ -272,7 +355,7 @@ async def websocket_endpoint(websocket: WebSocket, token: Optional[str] = None):
                     "query": running_task.query,
                     "phase": ctx.phase,
                     "progress": ctx.progress,
-                    "steps": [s.model_dump() for s in steps],
+                    "steps": _steps_adapter.dump_python(steps),
                     "signals": ctx.signals,
                     "charts": valid_charts,
                     "graph": ctx.transmission_graph
@@ -280,18 +363,7 @@ async def websocket_endpoint(websocket: WebSocket, token: Optional[str] = None):
             })
         else:
             # Show idle state because system is either idle OR running someone else's task
-            await websocket.send_json({
-                "type": "init",
-                "data": {
-                    "run_id": None,
-                    "status": "idle",
-                    "query": None,
-                    "steps": [],
-                    "signals": [],
-                    "charts": {},
-                    "graph": {}
-                }
-            })
+            await websocket.send_text(_IDLE_INIT_PAYLOAD)
         
         # 4. Message Loop
         while True:
@@ -303,14 +375,14 @@ async def websocket_endpoint(websocket: WebSocket, token: Optional[str] = None):
                 history = db.get_history(limit=50, user_id=user_id)
                 await websocket.send_json({
                     "type": "history",
-                    "data": [h.model_dump() for h in history]
+                    "data": _history_adapter.dump_python(history)
                 })
             
             elif msg.get("command") == "get_query_groups":
                 groups = db.get_query_groups(limit=20, user_id=user_id)
                 await websocket.send_json({
                     "type": "query_groups",
-                    "data": [g.model_dump() for g in groups]
+                    "data": _groups_adapter.dump_python(groups)
                 })
             
             elif msg.get("command") == "get_run_details":
@@ -324,7 +396,7 @@ async def websocket_endpoint(websocket: WebSocket, token: Optional[str] = None):
                             "type": "run_details",
                             "data": {
                                 "run": run.model_dump(),
-                                "steps": [s.model_dump() for s in steps]
+                                "steps": _steps_adapter.dump_python(steps)
                             }
                         })
                     else:
@@ -346,7 +418,7 @@ async def websocket_endpoint(websocket: WebSocket, token: Optional[str] = None):
                     ctx = run_state.get_run(user_active_run_id)
                     if ctx:
                         db_steps = db.get_steps(user_active_run_id)
-                        steps = [s.model_dump() for s in db_steps]
+                        steps = _steps_adapter.dump_python(db_steps)
 
                         valid_charts = {
                             k: v for k, v in ctx.charts.items()
@@ -368,18 +440,9 @@ async def websocket_endpoint(websocket: WebSocket, token: Optional[str] = None):
                             }
                         })
                     else:
-                        await websocket.send_json({
-                            "type": "init",
-                            "data": {"status": "idle", "is_running": False}
-                        })
+                        await websocket.send_text(_IDLE_STATUS_PAYLOAD)
                 else:
-                     await websocket.send_json({
-                        "type": "init",
-                        "data": {
-                            "status": "idle",
-                             "is_running": False
-                        }
-                    })
+                    await websocket.send_text(_IDLE_STATUS_PAYLOAD)
     
     except WebSocketDisconnect:
         if user_id:
@@ -466,7 +529,7 @@ async def start_run(request: RunRequest, current_user: dict = Depends(get_curren
         query=request.query,
         sources=sources_text,
         status="running",
-        started_at=datetime.now().isoformat(),
+        started_at=iso_now(),
         user_id=current_user['id']
     )
     if request.query:
@@ -560,14 +623,18 @@ async def cancel_run(current_user: dict = Depends(get_current_user)):
 async def get_history(limit: int = 50, current_user: dict = Depends(get_current_user)):
     """获取历史运行列表"""
     db = get_db()
-    return db.get_history(limit=limit, user_id=current_user['id'])
+    items = db.get_history(limit=limit, user_id=current_user['id'])
+    # 直接返回 Response：跳过 FastAPI 对 response_model 的整表重校验，
+    # 序列化走缓存的 TypeAdapter 单次批量 dump
+    return JSONResponse(content=_history_adapter.dump_python(items))
 
 
 @app.get("/api/query-groups", response_model=List[QueryGroup])
 async def get_query_groups(limit: int = 20, current_user: dict = Depends(get_current_user)):
     """按 Query 分组获取历史"""
     db = get_db()
-    return db.get_query_groups(limit=limit, user_id=current_user['id'])
+    groups = db.get_query_groups(limit=limit, user_id=current_user['id'])
+    return JSONResponse(content=_groups_adapter.dump_python(groups))
 
 
 @app.get("/api/hot-news")
@@ -678,11 +745,18 @@ async def get_run(run_id: str, current_user: dict = Depends(get_current_user)):
          logger.warning(f"⛔ Access denied in get_run: Run {run_id} belongs to user {str_run_user_id}, but requester is {str_current_user_id}")
          raise HTTPException(403, "无权访问此运行记录")
 
-    steps = db.get_steps(run_id)
-    return {
-        "run": run.model_dump(),
-        "steps": [s.model_dump() for s in steps]
-    }
+    # 流式输出：步骤逐条序列化发出，峰值内存不随 run 长度增长，
+    # 客户端也能边收边解析 (同步生成器由 Starlette 放到线程池迭代)
+    def gen():
+        yield b'{"run":' + json.dumps(run.model_dump(), ensure_ascii=False).encode() + b',"steps":['
+        first = True
+        for s in db.iter_steps(run_id):
+            sep = b'' if first else b','
+            first = False
+            yield sep + json.dumps(s.model_dump(), ensure_ascii=False).encode()
+        yield b']}'
+
+    return StreamingResponse(gen(), media_type="application/json")
 
 
 @app.get("/api/run/{run_id}/data")
@@ -840,7 +914,7 @@ async def update_run_endpoint(run_id: str, request: RunRequest, current_user: di
         query=old_run.query,
         sources=old_run.sources,
         status="running",
-        started_at=datetime.now().isoformat(),
+        started_at=iso_now(),
         parent_run_id=run_id,
         user_id=current_user['id']
     )
@@ -1074,54 +1148,75 @@ async def execute_update_workflow(base_run_id: str, user_query: Optional[str], n
     """Execute update logic"""
     from .integration import dashboard_callback, workflow_runner
     db = get_db()
-    loop = asyncio.get_event_loop()
-    
+    async_db = get_async_db()
+    # get_event_loop 在 3.12 中已弃用且会走存在性检查；协程内直接取运行中的 loop
+    loop = asyncio.get_running_loop()
+
     # 获取当前运行上下文
     ctx = run_state.get_run(new_run_id)
     if not ctx:
         ctx = run_state.create_context(new_run_id, user_id or "unknown")
     
     async def async_broadcast(message: dict):
-        msg_type = message.get("type")
-        data = message.get("data", {})
-        
-        # 从消息中获取 run_id 以支持并发
-        msg_run_id = data.get("run_id") or new_run_id
-        msg_ctx = run_state.get_run(msg_run_id)
-        if not msg_ctx:
-            msg_ctx = ctx
-
-        if msg_type == "progress":
-            msg_ctx.phase = data.get("phase", "")
-            msg_ctx.progress = data.get("progress", 0)
-        elif msg_type == "step":
-            step_run_id = data.get("run_id") or new_run_id
-            step = DashboardStep(
-                run_id=step_run_id,
-                step_type=data.get("type", ""),
-                agent=data.get("agent", ""),
-                content=data.get("content", ""),
-                timestamp=data.get("timestamp", datetime.now().isoformat())
-            )
-            db.add_step(step)
-
-        await run_state.broadcast(message)
+        is_batch = message.get("type") == "batch"
+        events = message.get("data", []) if is_batch else [message]
+
+        for event in events:
+            msg_type = event.get("type")
+            data = event.get("data", {})
+
+            # 从消息中获取 run_id 以支持并发
+            msg_run_id = data.get("run_id") or new_run_id
+            msg_ctx = run_state.get_run(msg_run_id)
+            if not msg_ctx:
+                msg_ctx = ctx
+
+            if msg_type == "progress":
+                msg_ctx.phase = data.get("phase", "")
+                msg_ctx.progress = data.get("progress", 0)
+            elif msg_type == "step":
+                # 回调数据来自我们自己的 workflow，可信，跳过逐字段校验
+                step = DashboardStep.model_construct(
+                    run_id=msg_run_id,
+                    step_type=data.get("type", ""),
+                    agent=data.get("agent", ""),
+                    content=data.get("content", ""),
+                    timestamp=data.get("timestamp") or iso_now()
+                )
+                # 入队即返回，后台任务批量落盘，不在事件循环上做 sqlite 事务
+                await async_db.add_step(step)
+
+        if is_batch:
+            grouped: Dict[str, List[dict]] = {}
+            for event in events:
+                rid = event.get("data", {}).get("run_id") or new_run_id
+                grouped.setdefault(rid, []).append(event)
+            for rid, rid_events in grouped.items():
+                await run_state.broadcast({"type": "batch", "run_id": rid, "data": rid_events})
+        else:
+            await run_state.broadcast(message)
 
     dashboard_callback.enable(async_broadcast, loop)
     
     try:
         ctx.status = "running"
+        # 完成事件由工作线程经 call_soon_threadsafe 触发，等待期间零唤醒
+        done = asyncio.Event()
+        workflow_runner.on_complete(new_run_id, lambda: loop.call_soon_threadsafe(done.set))
         workflow_runner.update_run_async(
-            base_run_id, 
-            run_state=ctx, 
-            user_query=user_query, 
+            base_run_id,
+            run_state=ctx,
+            user_query=user_query,
             new_run_id=new_run_id,
             user_id=user_id
         )
-        
-        while workflow_runner.is_running(new_run_id):
-            await asyncio.sleep(0.5)
-            
+
+        await done.wait()
+        # flusher 是 20ms 节拍，可能赶不上最后一跳；先把残留事件广播/入库
+        await dashboard_callback.drain()
+        # 确保在途步骤日志全部落盘后再做收尾同步
+        await async_db.flush_steps()
+
         # Post-processing: Sync the newly created run to SQLite
         try:
             from utils.checkpointing import CheckpointManager
@@ -1213,54 +1308,69 @@ async def execute_update_workflow(base_run_id: str, user_query: Optional[str], n
 async def execute_workflow(run_id: str, request: RunRequest, user_id: str = None, concurrency: int = 5):
     """执行真实的 AlphaEar 工作流"""
     from .integration import dashboard_callback, workflow_runner
-    
+
     db = get_db()
-    loop = asyncio.get_event_loop()
-    
+    async_db = get_async_db()
+    # get_event_loop 在 3.12 中已弃用且会走存在性检查；协程内直接取运行中的 loop
+    loop = asyncio.get_running_loop()
+
     # 获取当前运行上下文
     ctx = run_state.get_run(run_id)
     if not ctx:
         ctx = run_state.create_context(run_id, user_id or "unknown")
     
     async def async_broadcast(message: dict):
-        """处理回调消息并广播"""
-        msg_type = message.get("type")
-        data = message.get("data", {})
-        
-        # 从消息中获取 run_id 以支持并发
-        msg_run_id = data.get("run_id") or run_id
-        msg_ctx = run_state.get_run(msg_run_id)
-        if not msg_ctx:
-            msg_ctx = ctx  # fallback
-        
-        if msg_type == "progress":
-            msg_ctx.phase = data.get("phase", "")
-            msg_ctx.progress = data.get("progress", 0)
-        
-        elif msg_type == "step":
-            step_run_id = data.get("run_id") or run_id
-            step = DashboardStep(
-                run_id=step_run_id,
-                step_type=data.get("type", ""),
-                agent=data.get("agent", ""),
-                content=data.get("content", ""),
-                timestamp=data.get("timestamp", datetime.now().isoformat())
-            )
-            db.add_step(step)
-        
-        elif msg_type == "signal":
-            msg_ctx.signals.append(data)
-        
-        elif msg_type == "chart":
-            ticker = data.get("ticker")
-            if ticker:
-                msg_ctx.charts[ticker] = data
-        
-        elif msg_type == "graph":
-            msg_ctx.transmission_graph = data
-        
-        # 广播到对应用户
-        await run_state.broadcast(message)
+        """处理回调消息并广播 (batch 帧内含多个事件)"""
+        is_batch = message.get("type") == "batch"
+        events = message.get("data", []) if is_batch else [message]
+
+        for event in events:
+            msg_type = event.get("type")
+            data = event.get("data", {})
+
+            # 从消息中获取 run_id 以支持并发
+            msg_run_id = data.get("run_id") or run_id
+            msg_ctx = run_state.get_run(msg_run_id)
+            if not msg_ctx:
+                msg_ctx = ctx  # fallback
+
+            if msg_type == "progress":
+                msg_ctx.phase = data.get("phase", "")
+                msg_ctx.progress = data.get("progress", 0)
+
+            elif msg_type == "step":
+                # 回调数据来自我们自己的 workflow，可信，跳过逐字段校验
+                step = DashboardStep.model_construct(
+                    run_id=msg_run_id,
+                    step_type=data.get("type", ""),
+                    agent=data.get("agent", ""),
+                    content=data.get("content", ""),
+                    timestamp=data.get("timestamp") or iso_now()
+                )
+                # 入队即返回，后台任务批量落盘，不在事件循环上做 sqlite 事务
+                await async_db.add_step(step)
+
+            elif msg_type == "signal":
+                msg_ctx.signals.append(data)
+
+            elif msg_type == "chart":
+                ticker = data.get("ticker")
+                if ticker:
+                    msg_ctx.charts[ticker] = data
+
+            elif msg_type == "graph":
+                msg_ctx.transmission_graph = data
+
+        # 广播到对应用户 (batch 按 run_id 分组，每个目标一帧)
+        if is_batch:
+            grouped: Dict[str, List[dict]] = {}
+            for event in events:
+                rid = event.get("data", {}).get("run_id") or run_id
+                grouped.setdefault(rid, []).append(event)
+            for rid, rid_events in grouped.items():
+                await run_state.broadcast({"type": "batch", "run_id": rid, "data": rid_events})
+        else:
+            await run_state.broadcast(message)
     
     # 启用回调
     dashboard_callback.enable(async_broadcast, loop)
@@ -1276,6 +1386,10 @@ async def execute_workflow(run_id: str, request: RunRequest, user_id: str = None
             sources_text = sources_value or "financial"
             sources_list = [s.strip() for s in sources_text.split(",") if s.strip()]
         
+        # 完成事件由工作线程经 call_soon_threadsafe 触发，等待期间零唤醒
+        done = asyncio.Event()
+        workflow_runner.on_complete(run_id, lambda: loop.call_soon_threadsafe(done.set))
+
         workflow_runner.run_async(
             query=request.query,
             sources=sources_list,
@@ -1286,16 +1400,19 @@ async def execute_workflow(run_id: str, request: RunRequest, user_id: str = None
             run_id=run_id,
             concurrency=concurrency
         )
-        
+
         # 等待工作流完成
-        while workflow_runner.is_running(run_id):
-            await asyncio.sleep(0.5)
-        
+        await done.wait()
+        # flusher 是 20ms 节拍，可能赶不上最后一跳；先把残留事件广播/入库
+        await dashboard_callback.drain()
+        # 确保在途步骤日志全部落盘后再做收尾同步
+        await async_db.flush_steps()
+
         # 更新数据库
         db.update_run(
             run_id,
             status="completed",
-            finished_at=datetime.now().isoformat(),
+            finished_at=iso_now(),
             signal_count=len(ctx.signals),
             report_path=ctx.output
         )
@@ -1325,7 +1442,7 @@ async def execute_workflow(run_id: str, request: RunRequest, user_id: str = None
         db.update_run(
             run_id,
             status="failed",
-            finished_at=datetime.now().isoformat(),
+            finished_at=iso_now(),
             error_message=str(e)
         )
         ctx.status = "failed"
@@ -1350,17 +1467,22 @@ if reports_dir.exists():
 
 if frontend_dist.exists():
     app.mount("/assets", StaticFiles(directory=frontend_dist / "assets"), name="assets")
-    
+
+    # 构建产物在运行期不变，启动时扫一次目录，
+    # 之后每个请求只做一次集合查找而不是两次 stat 系统调用
+    _frontend_files = frozenset(
+        str(p.relative_to(frontend_dist)) for p in frontend_dist.rglob("*") if p.is_file()
+    )
+
     @app.get("/")
     async def serve_frontend():
         return FileResponse(frontend_dist / "index.html")
-    
+
     @app.get("/{path:path}")
     async def serve_frontend_routes(path: str):
         # 处理 React Router 路由
-        file_path = frontend_dist / path
-        if file_path.exists() and file_path.is_file():
-            return FileResponse(file_path)
+        if path in _frontend_files:
+            return FileResponse(frontend_dist / path)
         return FileResponse(frontend_dist / "index.html")
 else:
     @app.get("/")
@@ -1,4 +1,5 @@
 import sys
+from itertools import chain
 from pathlib import Path
 import os
 from typing import Optional, Union
@@ -8,19 +9,28 @@ def setup_environment():
     """
     Automatically locate project root based on marker file (pyproject.toml).
     Allows the skill to be moved anywhere within the project or run from arbitrary CWD.
+    The resolved root is cached in DEEPEAR_ROOT so restarts/subprocesses skip the walk.
     """
     current_path = Path(__file__).resolve()
-    
-    # Walk up looking for pyproject.toml
+
+    # Cached result from a previous resolution (env survives into subprocesses)
     root = None
-    for parent in [current_path] + list(current_path.parents):
-        if (parent / "pyproject.toml").exists() and (parent / "src").exists():
-            root = parent
-            break
-    
+    cached_root = os.environ.get("DEEPEAR_ROOT")
+    if cached_root:
+        cached_path = Path(cached_root)
+        if (cached_path / "src").exists():
+            root = cached_path
+
+    # Walk up looking for pyproject.toml (chain avoids building a throwaway list)
+    if not root:
+        for parent in chain([current_path], current_path.parents):
+            if (parent / "pyproject.toml").exists() and (parent / "src").exists():
+                root = parent
+                break
+
     # Fallback 1: Search for 'DeepEar' directory name in path hierarchy
     if not root:
-        for parent in [current_path] + list(current_path.parents):
+        for parent in chain([current_path], current_path.parents):
             if parent.name == "DeepEar" and (parent / "src").exists():
                 root = parent
                 break
@@ -28,7 +38,9 @@ def setup_environment():
     # Fallback 2: Hardcoded relative path (legacy/last resort)
     if not root:
         root = Path(__file__).parent.parent.parent.parent
-        
+
+    os.environ["DEEPEAR_ROOT"] = str(root)
+
     # 1. Add src to sys.path
     src_path = root / "src"
     if str(src_path) not in sys.path:
@@ -50,10 +62,13 @@ if root_dir and root_dir.exists():
         pass
 
 from fastapi import FastAPI, HTTPException, BackgroundTasks
+from fastapi.responses import JSONResponse
 from pydantic import BaseModel
 import uvicorn
 import asyncio
+import time
 import uuid
+from collections import OrderedDict
 from datetime import datetime
 
 # Try importing workflow
@@ -69,9 +84,54 @@ except ImportError:
 
 app = FastAPI(title="DeepEar Analysis Skill")
 
+# 任务保留时长 / 上限：完成的任务过期自动清理，长驻进程不再无限累积
+JOB_TTL_SECONDS = 86400
+JOB_STORE_MAXSIZE = 10_000
+
+
+class JobStore:
+    """有界 TTL 任务表 - 插入序即提交序，过期/超额从最旧端清理"""
+
+    def __init__(self, maxsize: int = JOB_STORE_MAXSIZE, ttl: float = JOB_TTL_SECONDS):
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()
+        self.maxsize = maxsize
+        self.ttl = ttl
+
+    def _purge(self):
+        now = time.time()
+        while self._data:
+            _, (expires, _) = next(iter(self._data.items()))
+            if expires > now and len(self._data) <= self.maxsize:
+                break
+            self._data.popitem(last=False)
+
+    def __setitem__(self, job_id: str, value: dict):
+        self._data[job_id] = (time.time() + self.ttl, value)
+        self._purge()
+
+    def get(self, job_id: str) -> Optional[dict]:
+        entry = self._data.get(job_id)
+        if entry is None:
+            return None
+        expires, value = entry
+        if expires <= time.time():
+            del self._data[job_id]
+            return None
+        return value
+
+    def __contains__(self, job_id: str) -> bool:
+        return self.get(job_id) is not None
+
+    def __getitem__(self, job_id: str) -> dict:
+        value = self.get(job_id)
+        if value is None:
+            raise KeyError(job_id)
+        return value
+
+
 # Simple in-memory job store
 # In production, use Redis or Database
-jobs = {}
+jobs = JobStore()
 
 class AnalyzeRequest(BaseModel):
     query: Optional[str] = None
@@ -99,8 +159,12 @@ def run_workflow_task(job_id: str, request: AnalyzeRequest, root_dir: Path):
         # Ensure we are in project root for this thread/process context
         if root_dir and root_dir.exists():
             os.chdir(str(root_dir))
-            
-        jobs[job_id]["status"] = "running"
+
+        # 取一次引用原地更新，避免任务运行中条目过期后 KeyError
+        job = jobs.get(job_id)
+        if job is None:
+            return
+        job["status"] = "running"
         
         # Initialize workflow
         workflow = SignalFluxWorkflow()
@@ -129,18 +193,20 @@ def run_workflow_task(job_id: str, request: AnalyzeRequest, root_dir: Path):
             )
         
         if report_path:
-            jobs[job_id]["status"] = "completed"
-            jobs[job_id]["result"] = {
+            job["status"] = "completed"
+            job["result"] = {
                 "report_path": report_path,
                 "message": "Analysis completed successfully."
             }
         else:
-            jobs[job_id]["status"] = "failed"
-            jobs[job_id]["error"] = "Workflow finished but returned no report path."
-            
+            job["status"] = "failed"
+            job["error"] = "Workflow finished but returned no report path."
+
     except Exception as e:
-        jobs[job_id]["status"] = "failed"
-        jobs[job_id]["error"] = str(e)
+        job = jobs.get(job_id)
+        if job is not None:
+            job["status"] = "failed"
+            job["error"] = str(e)
 
 @app.post("/analyze", response_model=JobResponse)
 async def analyze(request: AnalyzeRequest, background_tasks: BackgroundTasks):
@@ -158,12 +224,14 @@ async def analyze(request: AnalyzeRequest, background_tasks: BackgroundTasks):
     
     # Start background task
     background_tasks.add_task(run_workflow_task, job_id, request, root_dir)
-    
-    return {
+
+    # 响应字段我们自己刚构造，直接返回 JSONResponse 跳过 response_model 重校验
+    # (response_model 仅保留给 OpenAPI 文档)
+    return JSONResponse(content={
         "job_id": job_id,
         "status": "pending",
         "submitted_at": jobs[job_id]["submitted_at"]
-    }
+    })
 
 @app.get("/status/{job_id}", response_model=JobStatus)
 async def get_status(job_id: str):
@@ -171,17 +239,18 @@ async def get_status(job_id: str):
     Check the status of a job.
     Status: pending -> running -> completed | failed
     """
-    if job_id not in jobs:
+    # 单次查表：`in` + `[]` 会各走一遍 TTL 检查
+    job = jobs.get(job_id)
+    if job is None:
         raise HTTPException(status_code=404, detail="Job not found")
-        
-    job = jobs[job_id]
-    return {
+
+    return JSONResponse(content={
         "job_id": job_id,
         "status": job["status"],
         "result": job.get("result"),
         "error": job.get("error"),
         "timestamp": datetime.now().isoformat()
-    }
+    })
 
 if __name__ == "__main__":
     # Use a different port than the dashboard to avoid conflict
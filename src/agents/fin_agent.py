@@ -1,3 +1,4 @@
+import asyncio
 import os
 import time
 from datetime import datetime
@@ -138,6 +139,62 @@ class FinAgent:
                     logger.error("❌ FinAgent analysis failed after all retries")
                     return None
 
+    async def analyze_signal_async(self, signal_text: str, news_id: str = None, max_retries: int = 3) -> Optional[InvestmentSignal]:
+        """
+        analyze_signal 的协程版本：两阶段均走 Agent.arun，多条信号可在同一事件循环上
+        并发等待 LLM 响应，复用 HTTP 连接池且不占用线程栈
+        """
+        logger.info(f"💼 FinAgent starting dual-phase analysis (async) for: {signal_text[:50]}...")
+
+        # 第一阶段：研究员搜集信息（使用 Tool Model）
+        research_task = get_fin_research_task(signal_text)
+        research_context_str = ""
+        research_data = None
+
+        try:
+            logger.info("📊 Phase 1: Researcher gathering information using tools...")
+            research_response = await self.researcher.arun(research_task)
+            research_raw_response = research_response.content if hasattr(research_response, 'content') else str(research_response)
+            research_context_str = research_raw_response
+            research_data = extract_json(research_raw_response)
+            if research_data:
+                logger.info(f"✅ Research phase completed. Found tickers: {research_data.get('tickers_found', [])}")
+            else:
+                logger.info("✅ Research phase completed (unstructured format)")
+        except Exception as e:
+            logger.warning(f"⚠️ Research phase failed: {e}. Proceeding with raw signal only.")
+            research_context_str = "（研究阶段失败，将仅基于原始信号进行分析）"
+
+        # 第二阶段：分析师基于完整背景进行深度分析（使用 Reasoning Model）
+        analysis_task = get_fin_analysis_task(signal_text, research_context_str)
+
+        logger.info("🧠 Phase 2: Analyst performing deep ISQ analysis...")
+
+        for attempt in range(max_retries):
+            try:
+                response = await self.analyst.arun(analysis_task)
+                content = response.content if hasattr(response, 'content') else str(response)
+
+                json_data = extract_json(content)
+                if json_data:
+                    if news_id and not json_data.get('signal_id'):
+                        json_data['signal_id'] = news_id
+
+                    json_data = self._sanitize_signal_output(json_data, research_data=research_data, raw_signal=signal_text)
+
+                    logger.info(f"✅ Analysis completed successfully (attempt {attempt + 1}/{max_retries})")
+                    return InvestmentSignal(**json_data)
+
+                raise ValueError("Could not extract valid JSON from response")
+
+            except Exception as e:
+                logger.warning(f"⚠️ FinAgent analysis attempt {attempt + 1}/{max_retries} failed: {e}")
+                if attempt < max_retries - 1:
+                    await asyncio.sleep(2 ** attempt)
+                else:
+                    logger.error("❌ FinAgent analysis failed after all retries")
+                    return None
+
     @staticmethod
     def _clean_digits(value: str) -> str:
         s = (value or "").strip()
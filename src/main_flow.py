@@ -625,31 +625,23 @@ class SignalFluxWorkflow:
             callback.phase("刷新数据", 30)
             callback.step("tool_call", "StockTools", "刷新行情数据")
         stock_tools = StockTools(self.db, auto_update=False)
-        updated_tickers = set()
-        ticker_logged = 0
-        
+
+        # 先收集所有唯一标的，再批量并发刷新，替代逐标的串行网络往返
+        tickers_to_refresh = []
         for signal in analyzed_signals:
-            # Extract tickers from signal
             impact = signal.get('impact_tickers', [])
             if isinstance(impact, list):
                 for item in impact:
-                    if isinstance(item, dict):
-                        ticker = item.get('ticker')
-                        if ticker and ticker not in updated_tickers:
-                            try:
-                                # Force sync from network
-                                stock_tools.get_stock_price(str(ticker), force_sync=True)
-                                updated_tickers.add(ticker)
-                                logger.debug(f"   Refreshed: {ticker}")
-                                if callback and ticker_logged < 8:
-                                    callback.step("result", "StockTools", f"✅ 刷新: {ticker}")
-                                    ticker_logged += 1
-                            except Exception as e:
-                                logger.warning(f"   Failed to refresh {ticker}: {e}")
-                                if callback and ticker_logged < 8:
-                                    callback.step("warning", "StockTools", f"⚠️ 刷新失败: {ticker}")
-                                    ticker_logged += 1
-        
+                    if isinstance(item, dict) and item.get('ticker'):
+                        tickers_to_refresh.append(str(item['ticker']))
+
+        price_map = stock_tools.get_stock_prices_batch(tickers_to_refresh, force_sync=True)
+        updated_tickers = set(price_map.keys())
+
+        if callback:
+            for ticker in list(updated_tickers)[:8]:
+                callback.step("result", "StockTools", f"✅ 刷新: {ticker}")
+
         logger.info(f"✅ Market data refreshed for {len(updated_tickers)} tickers.")
         if callback:
             callback.step("result", "StockTools", f"✅ 刷新完成: {len(updated_tickers)} 支标的")
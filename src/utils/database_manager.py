@@ -541,18 +541,18 @@ class DatabaseManager:
 
     # --- 投资信号操作 (ISQ Framework) ---
 
-    def save_signal(self, signal: Dict[str, Any]):
-        """保存投资信号"""
-        cursor = self.conn.cursor()
-        created_at = datetime.now().isoformat()
-        
-        cursor.execute("""
-            INSERT OR REPLACE INTO signals 
-            (signal_id, title, summary, transmission_chain, sentiment_score, 
-             confidence, intensity, expected_horizon, price_in_status, 
+    _SIGNAL_INSERT_SQL = """
+            INSERT OR REPLACE INTO signals
+            (signal_id, title, summary, transmission_chain, sentiment_score,
+             confidence, intensity, expected_horizon, price_in_status,
              impact_tickers, industry_tags, sources, user_id, created_at)
             VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """, (
+        """
+
+    @staticmethod
+    def _signal_row(signal: Dict[str, Any], created_at: str) -> tuple:
+        """将信号 dict 转为 signals 表的参数元组"""
+        return (
             signal.get('signal_id'),
             signal.get('title'),
             signal.get('summary'),
@@ -567,7 +567,25 @@ class DatabaseManager:
             json.dumps(signal.get('sources', [])),
             signal.get('user_id'),
             created_at
-        ))
+        )
+
+    def save_signal(self, signal: Dict[str, Any]):
+        """保存投资信号"""
+        cursor = self.conn.cursor()
+        created_at = datetime.now().isoformat()
+        cursor.execute(self._SIGNAL_INSERT_SQL, self._signal_row(signal, created_at))
+        self.conn.commit()
+
+    def save_signal_many(self, signals: List[Dict[str, Any]]):
+        """批量保存投资信号 - executemany + 单次提交，N 条只付一次 commit 开销"""
+        if not signals:
+            return
+        cursor = self.conn.cursor()
+        created_at = datetime.now().isoformat()
+        cursor.executemany(
+            self._SIGNAL_INSERT_SQL,
+            [self._signal_row(signal, created_at) for signal in signals]
+        )
         self.conn.commit()
 
     def get_recent_signals(self, limit: int = 20, user_id: Optional[str] = None) -> List[Dict]:
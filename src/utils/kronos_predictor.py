@@ -1,3 +1,4 @@
+import contextlib
 import torch
 import pandas as pd
 import numpy as np
@@ -107,9 +108,14 @@ class KronosPredictorUtility:
                 logger.info("ℹ️ No trained news models found. Using base model.")
                 self.has_news_model = False
             
-            tokenizer = tokenizer.to(device)
-            model = model.to(device)
-            
+            tokenizer = tokenizer.to(device).eval()
+            model = model.to(device).eval()
+
+            self.device = device
+            # CUDA 上用 bf16 autocast 推理：显存带宽减半并启用 tensor core；
+            # mps/cpu 的 autocast 支持不稳定，保持全精度
+            self.autocast_dtype = torch.bfloat16 if device == "cuda" else None
+
             self._predictor = KronosPredictor(model, tokenizer, device=device, max_context=512)
             logger.info("✅ Kronos Model loaded successfully.")
         except Exception as e:
@@ -121,63 +127,95 @@ class KronosPredictorUtility:
         """
         生成原始模型预测
         """
+        return self.get_forecasts_batch(df, lookback=lookback, pred_len=pred_len, news_texts=[news_text])[0]
+
+    def get_forecasts_batch(
+        self,
+        df: pd.DataFrame,
+        lookback: int = 20,
+        pred_len: int = 5,
+        news_texts: Optional[List[Optional[str]]] = None
+    ) -> List[List[KLinePoint]]:
+        """
+        对同一段历史一次性生成多种新闻条件下的预测 (如 [news_text, None])。
+
+        切片、时间戳生成与新闻编码在各条件间共享；前向本身仍逐条件执行，
+        因为模型只在传入 news_emb 时启用新闻投影，带/不带新闻的条件无法
+        落进同一个 batch 张量。
+        """
+        news_texts = news_texts if news_texts else [None]
+
         if self._predictor is None:
             logger.error("Predictor not initialized.")
-            return []
+            return [[] for _ in news_texts]
 
         if len(df) < lookback:
             logger.warning(f"Insufficient historical data ({len(df)}) for lookback ({lookback}).")
-            return []
+            return [[] for _ in news_texts]
 
-        # 获取最后 lookback 条数据
+        # 获取最后 lookback 条数据 (所有条件共用)
         x_df = df.iloc[-lookback:].copy()
         x_timestamp = pd.to_datetime(x_df['date']) # Ensure datetime
         last_date = x_timestamp.iloc[-1]
-        
+
         # 生成未来时间戳
         future_dates = pd.date_range(start=last_date + BusinessDay(1), periods=pred_len, freq='B')
         y_timestamp = pd.Series(future_dates)
 
-        # Embedding News if available
-        news_emb = None
-        if news_text and getattr(self, 'has_news_model', False) and hasattr(self, 'embedder'):
+        # 预测所需的列
+        cols = ['open', 'high', 'low', 'close', 'volume']
+        x_input = x_df[cols]
+
+        # 相同新闻文本只编码一次
+        emb_cache: dict = {}
+        results: List[List[KLinePoint]] = []
+        for news_text in news_texts:
+            news_emb = None
+            if news_text and getattr(self, 'has_news_model', False) and hasattr(self, 'embedder'):
+                if news_text not in emb_cache:
+                    try:
+                        # Truncate to avoid too long text
+                        emb_cache[news_text] = self.embedder.encode(news_text[:1000])
+                    except Exception as e:
+                        logger.error(f"Failed to encode news: {e}")
+                        emb_cache[news_text] = None
+                news_emb = emb_cache[news_text]
+
             try:
-                # Truncate to avoid too long text
-                emb = self.embedder.encode(news_text[:1000])
-                news_emb = emb # KronosPredictor expects numpy array or tensor
+                autocast_ctx = (
+                    torch.autocast(device_type="cuda", dtype=self.autocast_dtype)
+                    if getattr(self, "autocast_dtype", None) is not None
+                    else contextlib.nullcontext()
+                )
+                with torch.inference_mode(), autocast_ctx:
+                    pred_df = self._predictor.predict(
+                        df=x_input,
+                        x_timestamp=x_timestamp,
+                        y_timestamp=y_timestamp,
+                        pred_len=pred_len,
+                        T=1.0,
+                        top_p=0.9,
+                        sample_count=1,
+                        verbose=False,
+                        news_emb=news_emb
+                    )
+
+                # 转换为 KLinePoint
+                points = []
+                for date, row in pred_df.iterrows():
+                    points.append(KLinePoint(
+                        date=date.strftime("%Y-%m-%d"),
+                        open=float(row['open']),
+                        high=float(row['high']),
+                        low=float(row['low']),
+                        close=float(row['close']),
+                        volume=float(row['volume'])
+                    ))
+                results.append(points)
             except Exception as e:
-                logger.error(f"Failed to encode news: {e}")
-
-        try:
-            # 预测所需的列
-            cols = ['open', 'high', 'low', 'close', 'volume']
-            pred_df = self._predictor.predict(
-                df=x_df[cols],
-                x_timestamp=x_timestamp,
-                y_timestamp=y_timestamp,
-                pred_len=pred_len,
-                T=1.0, 
-                top_p=0.9, 
-                sample_count=1,
-                verbose=False,
-                news_emb=news_emb
-            )
-            
-            # 转换为 KLinePoint
-            results = []
-            for date, row in pred_df.iterrows():
-                results.append(KLinePoint(
-                    date=date.strftime("%Y-%m-%d"),
-                    open=float(row['open']),
-                    high=float(row['high']),
-                    low=float(row['low']),
-                    close=float(row['close']),
-                    volume=float(row['volume'])
-                ))
-            return results
-        except Exception as e:
-            logger.error(f"Forecast generation failed: {e}")
-            return []
+                logger.error(f"Forecast generation failed: {e}")
+                results.append([])
+        return results
 
 # Singleton instance for easy access
 # Usage: predictor = KronosPredictorUtility()
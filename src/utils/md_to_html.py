@@ -152,31 +152,39 @@ def convert_md_to_html(md_content: str, title: str = "DeepEar Report") -> str:
     """
     return html_template
 
-def save_report_as_html(md_path: str, output_path: str = None):
-    if not output_path:
-        output_path = md_path.replace(".md", ".html")
-    
+def save_report_as_html_str(md_content: str, output_path: str):
+    """直接从内存中的 Markdown 渲染并保存 HTML，省掉临时 .md 的写后重读"""
     try:
-        with open(md_path, "r", encoding="utf-8") as f:
-            md_content = f.read()
-        
         title = "DeepEar 市场研报"
         # 尝试从第一行获取标题
-        lines = md_content.split('\n')
-        if lines and lines[0].startswith('# '):
-            title = lines[0].replace('# ', '').strip()
-            
+        first_line = md_content.split('\n', 1)[0]
+        if first_line.startswith('# '):
+            title = first_line.replace('# ', '').strip()
+
         html_content = convert_md_to_html(md_content, title)
-        
+
         with open(output_path, "w", encoding="utf-8") as f:
             f.write(html_content)
-            
+
         logger.info(f"✅ HTML Report saved to: {output_path}")
         return output_path
     except Exception as e:
         logger.error(f"Failed to convert report to HTML: {e}")
         return None
 
+def save_report_as_html(md_path: str, output_path: str = None):
+    if not output_path:
+        output_path = md_path.replace(".md", ".html")
+
+    try:
+        with open(md_path, "r", encoding="utf-8") as f:
+            md_content = f.read()
+    except Exception as e:
+        logger.error(f"Failed to convert report to HTML: {e}")
+        return None
+
+    return save_report_as_html_str(md_content, output_path)
+
 if __name__ == "__main__":
     import sys
     if len(sys.argv) > 1:
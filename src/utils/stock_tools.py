@@ -1,3 +1,4 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timedelta
 from typing import List, Dict, Optional
 import akshare as ak
@@ -183,6 +184,38 @@ class StockTools:
         
         return df_db
 
+    def get_stock_prices_batch(
+        self,
+        tickers: List[str],
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None,
+        force_sync: bool = False,
+        max_workers: int = 4,
+    ) -> Dict[str, pd.DataFrame]:
+        """
+        批量获取多只股票的历史价格。去重后并发拉取，总耗时接近最慢一只而非各只之和。
+
+        Returns:
+            ticker -> DataFrame 映射；拉取失败的标的不在结果中。
+        """
+        unique = list(dict.fromkeys(str(t) for t in tickers if t))
+        results: Dict[str, pd.DataFrame] = {}
+        if not unique:
+            return results
+
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(unique))) as pool:
+            futures = {
+                pool.submit(self.get_stock_price, t, start_date, end_date, force_sync): t
+                for t in unique
+            }
+            for future in as_completed(futures):
+                ticker = futures[future]
+                try:
+                    results[ticker] = future.result()
+                except Exception as e:
+                    logger.warning(f"⚠️ Batch price fetch failed for {ticker}: {e}")
+        return results
+
 
 def get_stock_analysis(ticker: str, db: DatabaseManager) -> str:
     """